@@ -17,8 +17,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 from processFile import urls as process_urls 
+from processFile.views import metrics
 
 urlpatterns = [
     path('products/', include(process_urls)),
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
 ]
@@ -0,0 +1,273 @@
+# catalog/copy_utils.py
+import bz2
+import csv
+import gzip
+import io
+import lzma
+from .staging import staging_table
+
+# upper bound for the text buffered between the CSV reader and COPY
+COPY_BUFFER_SIZE = 1 << 20
+
+# magic bytes -> opener for compressed uploads
+COMPRESSION_FORMATS = (
+    ("gzip", b"\x1f\x8b", gzip.open),
+    ("bz2", b"BZh", bz2.open),
+    ("xz", b"\xfd7zXZ\x00", lzma.open),
+)
+MAGIC_BYTES = max(len(magic) for _, magic, _ in COMPRESSION_FORMATS)
+# invalid UTF-8 becomes lone surrogates, which RowValidator rejects per row
+DECODE_ERRORS = "surrogateescape"
+
+
+def detect_compression(head):
+    """Name of the compression format `head` (leading file bytes) starts with, or None."""
+    for name, magic, _ in COMPRESSION_FORMATS:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_csv_text(file_path):
+    """
+    Open an uploaded CSV for reading as text, decompressing gzip/bz2/xz on
+    the fly; the file on disk is never expanded.
+    """
+    with open(file_path, "rb") as fh:
+        head = fh.read(MAGIC_BYTES)
+    for _, magic, opener in COMPRESSION_FORMATS:
+        if head.startswith(magic):
+            return opener(file_path, "rt", encoding="utf-8", errors=DECODE_ERRORS, newline="")
+    return open(file_path, "r", encoding="utf-8", errors=DECODE_ERRORS, newline="")
+
+
+def open_csv_binary(file_path):
+    """Like open_csv_text(), but yields decompressed bytes so offsets can be recorded."""
+    with open(file_path, "rb") as fh:
+        head = fh.read(MAGIC_BYTES)
+    for _, magic, opener in COMPRESSION_FORMATS:
+        if head.startswith(magic):
+            return opener(file_path, "rb")
+    return open(file_path, "rb")
+
+
+class OffsetLines:
+    """
+    Decoded lines of a binary file handle, starting at byte `offset` of the
+    (decompressed) stream. `offset` always points just past the last line
+    handed out, so after csv.reader yields a row it is where the next
+    record starts.
+    """
+
+    def __init__(self, fh, offset):
+        fh.seek(offset)
+        self.fh = fh
+        self.offset = offset
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.fh.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode("utf-8", DECODE_ERRORS)
+
+
+class _LineBuffer:
+    """Minimal writable target for csv.writer that collects formatted lines."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, s):
+        self.parts.append(s)
+
+
+class IteratorFile(io.TextIOBase):
+    """
+    Read-only file-like adapter over an iterator of text chunks.
+
+    psycopg2's copy_expert() pulls data with read(size), so the chunks are
+    only produced as fast as Postgres consumes them and at most `size` plus
+    one chunk is ever held in memory.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = []
+        self._buf_len = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = COPY_BUFFER_SIZE
+
+        while self._buf_len < size:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                break
+            self._buf.append(chunk)
+            self._buf_len += len(chunk)
+
+        data = "".join(self._buf)
+        rest = data[size:]
+        self._buf = [rest] if rest else []
+        self._buf_len = len(rest)
+        return data[:size]
+
+
+def staging_lines(job_id, header, rows, on_progress=None, every=5000):
+    """
+    Yield CSV text for COPY: the job_id-prefixed header followed by every
+    row, grouped into chunks of roughly COPY_BUFFER_SIZE characters.
+    """
+    out = _LineBuffer()
+    writer = csv.writer(out)
+    writer.writerow(["job_id"] + header)
+
+    size = 0
+    count = 0
+    for row in rows:
+        writer.writerow([job_id] + row)
+        size += len(out.parts[-1])
+        count += 1
+
+        if on_progress and count % every == 0:
+            on_progress(count)
+
+        if size >= COPY_BUFFER_SIZE:
+            yield "".join(out.parts)
+            out.parts.clear()
+            size = 0
+
+    if out.parts:
+        yield "".join(out.parts)
+
+
+def copy_to_staging(cur, job_id, header, rows, on_progress=None):
+    """
+    Stream `rows` into the job's staging table with COPY FROM STDIN.
+
+    Returns the number of rows sent.
+    """
+    counter = {"rows": 0}
+
+    def _count(rows_iter):
+        for row in rows_iter:
+            counter["rows"] += 1
+            yield row
+
+    # csv.writer emits empty strings unquoted, which COPY would load as NULL
+    not_null = [c for c in header if c != "sku"]
+    force_not_null = f", FORCE_NOT_NULL ({', '.join(not_null)})" if not_null else ""
+    copy_sql = f"""
+        COPY {staging_table(job_id)} (job_id, {", ".join(header)})
+        FROM STDIN WITH (FORMAT csv, HEADER true{force_not_null})
+    """
+    cur.copy_expert(
+        copy_sql,
+        IteratorFile(staging_lines(job_id, header, _count(rows), on_progress)),
+        size=COPY_BUFFER_SIZE,
+    )
+    return counter["rows"]
+
+
+def read_header_line(fh):
+    """Read the first line of a binary file handle; returns (header, offset)."""
+    line = fh.readline()
+    header = next(csv.reader([line.decode("utf-8-sig")]))
+    return header, len(line)
+
+
+def _quote_parity(data):
+    """1 when `data` holds an odd number of double quotes."""
+    return data.count(b'"') & 1
+
+
+def shard_ranges(file_path, shards, block=1024 * 1024):
+    """
+    Split the data section of `file_path` (everything after the header) into
+    at most `shards` (start, end) byte ranges that each hold whole records.
+
+    A newline only ends a record outside a quoted field. CSV escapes a quote
+    inside a quoted field by doubling it, so a position is inside quotes
+    exactly when an odd number of quotes precede it; the file is scanned once
+    to track that parity up to every boundary.
+    """
+    with open(file_path, "rb") as fh:
+        _, start = read_header_line(fh)
+        fh.seek(0, io.SEEK_END)
+        size = fh.tell()
+
+        step = max((size - start) // max(shards, 1), 1)
+        bounds = [start]
+        fh.seek(start)
+        pos = start
+        quoted = 0
+        for target in range(start + step, size, step):
+            if len(bounds) >= shards:
+                break
+            # count quotes up to the target ...
+            while pos < target:
+                data = fh.read(min(block, target - pos))
+                if not data:
+                    break
+                quoted ^= _quote_parity(data)
+                pos += len(data)
+            # ... then move to the first newline outside a quoted field
+            while pos < size:
+                line = fh.readline()
+                if not line:
+                    break
+                quoted ^= _quote_parity(line)
+                pos += len(line)
+                if not quoted and line.endswith(b"\n"):
+                    break
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+        bounds.append(size)
+
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)
+            if bounds[i] < bounds[i + 1]]
+
+
+def iter_range_lines(fh, start, end):
+    """Yield decoded lines of a binary file handle between two byte offsets."""
+    fh.seek(start)
+    pos = start
+    while pos < end:
+        line = fh.readline()
+        if not line:
+            break
+        pos += len(line)
+        yield line.decode("utf-8", DECODE_ERRORS)
+
+
+def last_record_end(fh, start, end):
+    """
+    Offset just past the last record in [start, end) of a binary file
+    handle, or `start` when that range holds no complete record. `start`
+    must itself be a record boundary; newlines inside quoted fields are
+    skipped the same way shard_ranges() skips them.
+    """
+    fh.seek(start)
+    pos = start
+    last = start
+    quoted = 0
+    while pos < end:
+        line = fh.readline(end - pos)
+        if not line:
+            break
+        quoted ^= _quote_parity(line)
+        pos += len(line)
+        if not quoted and line.endswith(b"\n"):
+            last = pos
+    return last
+
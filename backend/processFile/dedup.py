@@ -0,0 +1,112 @@
+# catalog/dedup.py
+import os
+import sqlite3
+import tempfile
+from itertools import islice
+from django.conf import settings
+
+LOOKUP_BATCH = 500
+
+
+class LastWinsIndex:
+    """
+    Maps each sku to the line number of its last occurrence.
+
+    Skus are compared exactly: a digest could collide, and Python's
+    str.lower() does not always agree with Postgres LOWER(), so either
+    would drop distinct skus. Rows differing only in case are left to the
+    merge's DISTINCT ON (LOWER(sku)).
+
+    Entries live in a plain dict until `max_keys` is reached; from then on
+    they are spilled in bulk into a temporary on-disk SQLite table, so very
+    large files do not need the whole index in memory.
+    """
+
+    def __init__(self, max_keys=None):
+        self.max_keys = max_keys or getattr(settings, "IMPORT_DEDUP_MAX_KEYS", 2_000_000)
+        self._mem = {}
+        self._db = None
+        self._db_path = None
+
+    def add(self, key, line):
+        self._mem[key] = line
+        if len(self._mem) >= self.max_keys:
+            self._spill()
+
+    def _spill(self):
+        if self._db is None:
+            fd, self._db_path = tempfile.mkstemp(prefix="dedup-", suffix=".sqlite3")
+            os.close(fd)
+            self._db = sqlite3.connect(self._db_path)
+            self._db.execute("PRAGMA journal_mode=OFF")
+            self._db.execute("PRAGMA synchronous=OFF")
+            self._db.execute("CREATE TABLE idx (k TEXT PRIMARY KEY, n INTEGER NOT NULL)")
+        # lines only grow, so a later entry always replaces an earlier one
+        self._db.executemany("INSERT OR REPLACE INTO idx (k, n) VALUES (?, ?)", self._mem.items())
+        self._db.commit()
+        self._mem.clear()
+
+    def finish(self):
+        """Call once every row has been added, before lookups."""
+        if self._db is not None and self._mem:
+            self._spill()
+
+    def last_lines(self, keys):
+        """{key: last line} for a batch of keys."""
+        if self._db is None:
+            return {k: self._mem[k] for k in keys if k in self._mem}
+        found = {}
+        keys = list(set(keys))
+        for i in range(0, len(keys), LOOKUP_BATCH):
+            chunk = keys[i:i + LOOKUP_BATCH]
+            marks = ",".join("?" * len(chunk))
+            found.update(self._db.execute(f"SELECT k, n FROM idx WHERE k IN ({marks})", chunk))
+        return found
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            os.unlink(self._db_path)
+            self._db = None
+        self._mem.clear()
+
+
+def build_index(numbered_rows, validator):
+    """First pass: remember the last line of every valid row per sku."""
+    index = LastWinsIndex()
+    for line, row in numbered_rows:
+        if row and validator.reason(row) is None:
+            index.add(row[validator.sku_idx], line)
+    index.finish()
+    return index
+
+
+class LastWinsFilter:
+    """
+    Second pass: drop valid rows that are superseded by a later row with the
+    same sku. Invalid rows are kept so the validator can report them.
+    """
+
+    def __init__(self, index, validator, batch=2000):
+        self.index = index
+        self.validator = validator
+        self.batch = batch
+        self.dropped = 0
+
+    def filter(self, numbered_rows):
+        numbered_rows = iter(numbered_rows)
+        while True:
+            batch = list(islice(numbered_rows, self.batch))
+            if not batch:
+                break
+            keyed = [
+                (line, row, row[self.validator.sku_idx]
+                 if row and self.validator.reason(row) is None else None)
+                for line, row in batch
+            ]
+            last = self.index.last_lines([k for _, _, k in keyed if k is not None])
+            for line, row, key in keyed:
+                if key is None or last.get(key) == line:
+                    yield line, row
+                else:
+                    self.dropped += 1
@@ -0,0 +1,107 @@
+# catalog/export.py
+import asyncio
+import queue
+import threading
+import zlib
+from django.db import connection
+
+EXPORT_FIELDS = ("id", "sku", "name", "description", "active", "created_at", "updated_at")
+
+_DONE = object()
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _put(chunks, cancelled, item):
+    # bounded queue: COPY only runs as fast as the client reads
+    while True:
+        if cancelled.is_set():
+            raise _Cancelled()
+        try:
+            chunks.put(item, timeout=1.0)
+            return
+        except queue.Full:
+            continue
+
+
+class _QueueWriter:
+    """File-like sink for copy_expert that hands chunks to the response."""
+
+    def __init__(self, chunks, cancelled, compressor=None):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.compressor = compressor
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        size = len(data)
+        if self.compressor is not None:
+            data = self.compressor.compress(data)
+        if data:
+            _put(self.chunks, self.cancelled, bytes(data))
+        return size
+
+
+async def _get(chunks):
+    # short timeouts, so an abandoned wait never pins an executor thread
+    while True:
+        try:
+            return await asyncio.to_thread(chunks.get, timeout=1.0)
+        except queue.Empty:
+            continue
+
+
+async def stream_copy_csv(qs, compress=False, max_chunks=64):
+    """
+    Yield the rows of `qs` as CSV produced by Postgres COPY ... TO STDOUT.
+
+    COPY runs on its own connection in a background thread; its output is
+    passed through a bounded queue (optionally gzip-compressed on the fly,
+    in that thread) so a full-catalog dump never touches the ORM, sits in
+    memory or blocks the event loop.
+    """
+    chunks = queue.Queue(maxsize=max_chunks)
+    cancelled = threading.Event()
+
+    def produce():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        try:
+            with connection.cursor() as cur:
+                sql, params = qs.values_list(*EXPORT_FIELDS).query.sql_with_params()
+                query = cur.mogrify(sql, params)
+                if isinstance(query, bytes):
+                    query = query.decode("utf-8")
+                cur.copy_expert(
+                    f"COPY ({query}) TO STDOUT WITH CSV HEADER",
+                    _QueueWriter(chunks, cancelled, compressor),
+                )
+            if compressor is not None:
+                _put(chunks, cancelled, compressor.flush())
+            _put(chunks, cancelled, _DONE)
+        except _Cancelled:
+            pass  # the client went away
+        except Exception as exc:
+            try:
+                _put(chunks, cancelled, exc)
+            except _Cancelled:
+                pass
+        finally:
+            # the thread's connection is not managed by the request cycle
+            connection.close()
+
+    worker = threading.Thread(target=produce, name="product-export", daemon=True)
+    worker.start()
+
+    try:
+        while True:
+            item = await _get(chunks)
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
@@ -0,0 +1,68 @@
+# catalog/lanes.py
+import os
+from django.conf import settings
+from .copy_utils import MAGIC_BYTES, detect_compression, open_csv_binary
+
+# bytes read from the start of a file to estimate its average row length
+SAMPLE_BYTES = 256 * 1024
+# assumed expansion of compressed CSV when its decompressed size is unknown
+COMPRESSION_RATIO_GUESS = 8
+
+# fallback when settings.IMPORT_LANES is unset: one lane, the default queues
+DEFAULT_LANES = {"bulk": {"queue": "imports", "merge_queue": "imports_merge"}}
+
+
+def lanes():
+    """Configured lanes, smallest first; the last one takes everything else."""
+    return getattr(settings, "IMPORT_LANES", DEFAULT_LANES)
+
+
+def lane_config(name):
+    configured = lanes()
+    return configured.get(name) or configured[default_lane()]
+
+
+def default_lane():
+    return list(lanes())[-1]
+
+
+def choose_lane(size=None, rows=None):
+    """First lane whose max_bytes/max_rows limits fit the job."""
+    for name, lane in lanes().items():
+        if size is not None and size > lane.get("max_bytes", float("inf")):
+            continue
+        if rows is not None and rows > lane.get("max_rows", float("inf")):
+            continue
+        return name
+    return default_lane()
+
+
+def estimate_rows(file_path):
+    """
+    Rough row count from the average length of the first rows; compressed
+    files are assumed to expand by COMPRESSION_RATIO_GUESS.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as fh:
+        compressed = detect_compression(fh.read(MAGIC_BYTES)) is not None
+    with open_csv_binary(file_path) as fh:
+        sample = fh.read(SAMPLE_BYTES)
+    lines = sample.count(b"\n")
+    if lines == 0:
+        return 0
+    if len(sample) < SAMPLE_BYTES:
+        return lines - 1  # the whole file fit in the sample; minus the header
+    expanded = size * COMPRESSION_RATIO_GUESS if compressed else size
+    return int(expanded / (len(sample) / lines))
+
+
+def lane_for_file(file_path):
+    return choose_lane(os.path.getsize(file_path), estimate_rows(file_path))
+
+
+def import_queue(job):
+    return lane_config((job.options or {}).get("lane"))["queue"]
+
+
+def merge_queue(job):
+    return lane_config((job.options or {}).get("lane"))["merge_queue"]
@@ -0,0 +1,191 @@
+# catalog/listing.py
+import base64
+import hashlib
+import json
+import logging
+import time
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+def filter_products(params):
+    """
+    Apply the sku/active query-string filters shared by product endpoints.
+
+    `sku` is matched against the lowercased sku: as a substring (pg_trgm GIN
+    index) by default, or as a prefix (text_pattern_ops btree) with
+    `match=prefix`. Search results are ranked exact > prefix > substring and
+    ordered by (rank, id), which keyset pagination seeks on.
+    """
+    sku_filter = params.get("sku", None)
+    active_filter = params.get("active", None)
+    match = params.get("match", "contains")
+
+    qs = Product.objects.all()
+
+    if sku_filter:
+        term = sku_filter.lower()
+        qs = qs.annotate(sku_lower=Lower("sku"))
+        if match == "prefix":
+            qs = qs.filter(sku_lower__startswith=term)
+        else:
+            qs = qs.filter(sku_lower__contains=term)
+        qs = qs.annotate(rank=Case(
+            When(sku_lower=term, then=Value(0)),
+            When(sku_lower__startswith=term, then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField(),
+        ))
+
+    if active_filter is not None:
+        if active_filter.lower() == "true":
+            qs = qs.filter(active=True)
+        elif active_filter.lower() == "false":
+            qs = qs.filter(active=False)
+
+    if sku_filter:
+        return qs.order_by("rank", "id")
+    return qs.order_by("id")
+
+
+def seek(qs, position):
+    """Keyset filter: rows strictly after `position` in the (rank, id) order."""
+    if "rank" not in qs.query.annotations:
+        return qs.filter(id__gt=position["id"])
+
+    rank = position.get("rank")
+    if rank is None:
+        # plain ?after=<id>: look up where that row sits in the ranking
+        rank = qs.filter(id=position["id"]).values_list("rank", flat=True).first()
+        if rank is None:
+            raise ValueError("cursor row is not part of this result set")
+    return qs.filter(Q(rank__gt=rank) | Q(rank=rank, id__gt=position["id"]))
+
+
+def cursor_for(obj):
+    position = {"id": obj.id}
+    if hasattr(obj, "rank"):
+        position["rank"] = obj.rank
+    return encode_cursor(position)
+
+
+def is_filtered(params):
+    return bool(params.get("sku")) or (params.get("active") or "").lower() in ("true", "false")
+
+
+def encode_cursor(data):
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode an opaque cursor token; raises ValueError when it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+    if not isinstance(data, dict) or not isinstance(data.get("id"), int):
+        raise ValueError("invalid cursor")
+    return data
+
+
+def estimate_count(qs, filtered):
+    """
+    Row count from planner statistics instead of a full COUNT(*).
+
+    Unfiltered queries read pg_class.reltuples; filtered ones take the row
+    estimate from EXPLAIN. Falls back to an exact count when the table has
+    never been analyzed.
+    """
+    with connection.cursor() as cur:
+        if not filtered:
+            cur.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [Product._meta.db_table],
+            )
+            row = cur.fetchone()
+            if row and row[0] >= 0:
+                return row[0]
+        else:
+            sql, params = qs.order_by().values("id").query.sql_with_params()
+            cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cur.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+    return qs.count()
+
+
+# ---------------------------------------------------------
+# VERSIONED RESPONSE CACHE
+# Cached listings are keyed by the catalog version, so every
+# catalog write invalidates them all with a single INCR.
+# The cache is an optimization: when it is unreachable, listings
+# are served uncached and writes go on without bumping.
+# ---------------------------------------------------------
+CATALOG_VERSION_KEY = "catalog:version"
+
+
+def catalog_version():
+    """Current catalog version, or None when the cache is unreachable."""
+    try:
+        version = cache.get(CATALOG_VERSION_KEY)
+        if version is None:
+            # start from the clock so a lost key never brings back old versions
+            cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+            version = cache.get(CATALOG_VERSION_KEY)
+    except Exception as e:
+        logger.warning("Catalog version unavailable; serving listings uncached: %s", e)
+        return None
+    return version
+
+
+def bump_catalog_version():
+    """Call after any write that changes what product listings return."""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        catalog_version()
+    except Exception as e:
+        # never fail (or mask the error of) the write that changed the catalog
+        logger.warning("Failed to bump the catalog version: %s", e)
+
+
+def get_cached_listing(key):
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning("Listing cache read failed: %s", e)
+        return None
+
+
+def set_cached_listing(key, entry):
+    try:
+        cache.set(key, entry, getattr(settings, "LISTING_CACHE_TTL", 300))
+    except Exception as e:
+        logger.warning("Listing cache write failed: %s", e)
+
+
+def params_digest(params, ignore=()):
+    """Stable digest of query params, independent of their order."""
+    items = sorted(
+        (key, value)
+        for key, values in params.lists() if key not in ignore
+        for value in values
+    )
+    return hashlib.md5(urlencode(items).encode("utf-8")).hexdigest()
+
+
+def listing_etag(params, version):
+    return f'"{version}-{params_digest(params)[:16]}"'
+
+
+def listing_cache_key(params, version):
+    return f"listing:{version}:{params_digest(params)}"
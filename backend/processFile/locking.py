@@ -0,0 +1,108 @@
+# catalog/locking.py
+from contextlib import contextmanager
+from uuid import UUID
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, connection, transaction
+
+# two-int pg_advisory_lock() key that mirror merges take exclusively and
+# every other merge batch shares
+MERGE_LOCK_NAMESPACE = 7001
+MERGE_GATE = 0
+# SQLSTATE of a lock wait that ran into lock_timeout
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+def lock_timed_out(exc):
+    """True when a database error is a lock wait that hit lock_timeout."""
+    return getattr(exc.__cause__, "pgcode", None) == LOCK_NOT_AVAILABLE
+
+
+def set_lock_timeout(cur, seconds):
+    """Make lock waits give up after `seconds`, until the transaction ends."""
+    cur.execute("SELECT set_config('lock_timeout', %s, true)", [f"{int(seconds * 1000)}ms"])
+
+
+def _wait_seconds():
+    return getattr(settings, "MERGE_LOCK_WAIT_SECONDS", 30)
+
+
+def lock_batch(cur):
+    """
+    Share the merge gate for the rest of the batch's transaction.
+
+    Batches take no sku locks of their own: the merge hands its rows to
+    ON CONFLICT in LOWER(sku) order, so batches that overlap lock their
+    common rows in the same order and one simply waits for the other,
+    while disjoint ones never meet. The gate only keeps them out of a
+    mirror merge (see exclusive_merge_lock()).
+
+    Any lock wait of the batch, on the gate or on a row, gives up after
+    MERGE_LOCK_WAIT_SECONDS with an OperationalError (see lock_timed_out());
+    the caller rolls the batch back, beats and tries again.
+    """
+    set_lock_timeout(cur, _wait_seconds())
+    cur.execute("SELECT pg_advisory_xact_lock_shared(%s, %s)", [MERGE_LOCK_NAMESPACE, MERGE_GATE])
+
+
+@contextmanager
+def exclusive_merge_lock(on_wait=None):
+    """
+    Hold the merge gate exclusively at session level, so no other merge
+    batch runs meanwhile.
+
+    For mirror imports, which touch skus outside their file: the lock
+    survives the per-batch commits, and is dropped with the session if a
+    worker dies. `on_wait` is called every MERGE_LOCK_WAIT_SECONDS the gate
+    stays busy.
+    """
+    while True:
+        try:
+            with transaction.atomic(), connection.cursor() as cur:
+                set_lock_timeout(cur, _wait_seconds())
+                cur.execute("SELECT pg_advisory_lock(%s, %s)", [MERGE_LOCK_NAMESPACE, MERGE_GATE])
+            break
+        except OperationalError as e:
+            if not lock_timed_out(e):
+                raise
+            if on_wait is not None:
+                on_wait()
+    try:
+        yield
+    finally:
+        with connection.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s, %s)", [MERGE_LOCK_NAMESPACE, MERGE_GATE])
+
+
+def _job_key(job_id):
+    # the one-bigint form, which never collides with the merge gate
+    return int.from_bytes(UUID(str(job_id)).bytes[:8], "big", signed=True)
+
+
+@contextmanager
+def job_lock(job_id, shared=False, block=False):
+    """
+    Session-level advisory lock on one import job, held by whichever task
+    works on it: phases take it exclusively, shards share it. Yields whether
+    it was acquired; without `block` a held lock is not waited for.
+
+    Celery redelivers a message whose worker is presumed dead, so this is
+    what keeps a second run of the same phase from overlapping the first.
+    """
+    kind = "_shared" if shared else ""
+    key = _job_key(job_id)
+    with connection.cursor() as cur:
+        if block:
+            cur.execute(f"SELECT pg_advisory_lock{kind}(%s)", [key])
+            held = True
+        else:
+            cur.execute(f"SELECT pg_try_advisory_lock{kind}(%s)", [key])
+            held = cur.fetchone()[0]
+    try:
+        yield held
+    finally:
+        if held:
+            try:
+                with connection.cursor() as cur:
+                    cur.execute(f"SELECT pg_advisory_unlock{kind}(%s)", [key])
+            except DatabaseError:
+                pass  # the connection is gone, and the lock with it
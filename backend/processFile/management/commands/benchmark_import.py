@@ -0,0 +1,169 @@
+import json
+import os
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from celery import current_app
+from django.core.management.base import BaseCommand
+from django.db import connection
+from processFile.models import Product, UploadJob
+from processFile.staging import staging_table
+from processFile.tasks import process_csv_phase1, process_csv_phase2
+from .generate_catalog import generate_catalog
+
+
+def _reset_peak_rss():
+    """
+    Restart the kernel's RSS high-water mark so each phase reports its own
+    peak. Returns False where that is unsupported (no /proc, old kernels).
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def _peak_rss_mb():
+    # VmHWM honours _reset_peak_rss(); ru_maxrss (KiB on Linux) is a
+    # lifetime high-water mark, so later phases inherit earlier peaks
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _relation_size(name):
+    with connection.cursor() as cur:
+        cur.execute("SELECT coalesce(pg_total_relation_size(to_regclass(%s)), 0)", [name])
+        return cur.fetchone()[0]
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Run both import phases eagerly on synthetic catalogs against the "
+        "configured Postgres/Redis and write a JSON report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[100_000],
+                            help="catalog sizes to benchmark, e.g. 100000 1000000")
+        parser.add_argument("--existing", type=int, default=0,
+                            help="products imported (unmeasured) before each run")
+        parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+        parser.add_argument("--case-ratio", type=float, default=0.1)
+        parser.add_argument("--overlap-ratio", type=float, default=0.0)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--shards", type=int, default=1)
+        parser.add_argument("--output", help="report path (default: stdout)")
+        parser.add_argument("--reset", action="store_true",
+                            help="TRUNCATE the product table before every run")
+
+    def handle(self, *args, **options):
+        current_app.conf.task_always_eager = True
+        current_app.conf.task_eager_propagates = True
+
+        report = {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "params": {k: options[k] for k in (
+                "rows", "existing", "duplicate_ratio", "case_ratio",
+                "overlap_ratio", "seed", "shards",
+            )},
+            "runs": [],
+        }
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for rows in options["rows"]:
+                report["runs"].append(self._run(tmp, rows, options))
+
+        out = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(out + "\n")
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(out)
+
+    def _import(self, path, shards, measure):
+        job = UploadJob.objects.create(filename=os.path.basename(path), status="pending")
+        job_id = str(job.id)
+
+        per_phase = _reset_peak_rss()
+        t0 = time.perf_counter()
+        process_csv_phase1.apply(args=[job_id, path], kwargs={"shards": shards, "merge": False}).get()
+        t1 = time.perf_counter()
+        rss_phase1 = _peak_rss_mb()
+        staging_bytes = _relation_size(staging_table(job_id))
+
+        _reset_peak_rss()
+        process_csv_phase2.apply(args=[job_id]).get()
+        t2 = time.perf_counter()
+
+        if not measure:
+            return None
+        job.refresh_from_db()
+        return {
+            "phase1": {
+                "seconds": round(t1 - t0, 3),
+                "rows_per_sec": round(job.total_rows / (t1 - t0), 1) if t1 > t0 else None,
+                "peak_rss_mb": rss_phase1,
+                "staging_bytes": staging_bytes,
+            },
+            "phase2": {
+                "seconds": round(t2 - t1, 3),
+                "rows_per_sec": round(job.total_rows / (t2 - t1), 1) if t2 > t1 else None,
+                "peak_rss_mb": _peak_rss_mb(),
+                "inserted": job.inserted_rows,
+                "updated": job.updated_rows,
+                "unchanged": job.unchanged_rows,
+            },
+            "status": job.status,
+            # False: peaks are lifetime high-water marks, not per phase
+            "per_phase_rss": per_phase,
+        }
+
+    def _run(self, tmp, rows, options):
+        if options["reset"]:
+            with connection.cursor() as cur:
+                cur.execute(f'TRUNCATE TABLE "{Product._meta.db_table}"')
+
+        if options["existing"]:
+            seed_path = os.path.join(tmp, "seed.csv")
+            generate_catalog(seed_path, options["existing"], seed=options["seed"])
+            self._import(seed_path, 1, measure=False)
+
+        path = os.path.join(tmp, f"catalog-{rows}.csv")
+        generate_catalog(
+            path, rows,
+            existing=options["existing"],
+            duplicate_ratio=options["duplicate_ratio"],
+            case_ratio=options["case_ratio"],
+            overlap_ratio=options["overlap_ratio"],
+            seed=options["seed"] + rows,
+        )
+        self.stderr.write(f"Benchmarking {rows} rows ...")
+
+        result = self._import(path, options["shards"], measure=True)
+        result.update({
+            "rows": rows,
+            "file_bytes": os.path.getsize(path),
+            "product_table_bytes": _relation_size(Product._meta.db_table),
+        })
+        return result
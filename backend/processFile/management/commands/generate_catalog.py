@@ -0,0 +1,74 @@
+import random
+from django.core.management.base import BaseCommand
+
+WORDS = (
+    "steel", "cotton", "wireless", "compact", "premium", "outdoor", "classic",
+    "smart", "portable", "organic", "deluxe", "ultra", "mini", "pro", "eco",
+)
+
+
+def sku_for(n):
+    return f"SKU-{n:09d}"
+
+
+def generate_catalog(path, rows, existing=0, duplicate_ratio=0.0, case_ratio=0.0,
+                     overlap_ratio=0.0, seed=0):
+    """
+    Write a deterministic product CSV (sku,name,description) to `path`.
+
+    - duplicate_ratio: share of rows repeating a sku seen earlier in the file
+    - overlap_ratio: share of rows reusing one of the `existing` catalog skus
+      (SKU-000000000 .. existing - 1, as written by a seed file)
+    - case_ratio: share of rows whose sku is written with different casing
+
+    The same arguments always produce the same file. Returns the number of
+    distinct (case-insensitive) skus written.
+    """
+    rng = random.Random(seed)
+    new_skus = 0
+
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        fh.write("sku,name,description\n")
+        for i in range(rows):
+            r = rng.random()
+            if new_skus and r < duplicate_ratio:
+                n = existing + rng.randrange(new_skus)
+            elif existing and r < duplicate_ratio + overlap_ratio:
+                n = rng.randrange(existing)
+            else:
+                n = existing + new_skus
+                new_skus += 1
+
+            sku = sku_for(n)
+            if rng.random() < case_ratio:
+                sku = "".join(c.lower() if rng.random() < 0.5 else c for c in sku)
+
+            words = " ".join(rng.choice(WORDS) for _ in range(6))
+            fh.write(f"{sku},Product {n} rev {i},{words}\n")
+
+    return new_skus
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic product catalog CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--existing", type=int, default=0,
+                            help="number of catalog skus that may be overlapped")
+        parser.add_argument("--duplicate-ratio", type=float, default=0.0)
+        parser.add_argument("--case-ratio", type=float, default=0.0)
+        parser.add_argument("--overlap-ratio", type=float, default=0.0)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        new_skus = generate_catalog(
+            options["path"], options["rows"],
+            existing=options["existing"],
+            duplicate_ratio=options["duplicate_ratio"],
+            case_ratio=options["case_ratio"],
+            overlap_ratio=options["overlap_ratio"],
+            seed=options["seed"],
+        )
+        self.stdout.write(f"Wrote {options['rows']} rows ({new_skus} new skus) to {options['path']}")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from acme import celery_app
+from processFile.lanes import lanes
+
+
+class Command(BaseCommand):
+    help = (
+        "Start a Celery worker for one import lane (settings.IMPORT_LANES), "
+        "consuming its phase 1 queue, or its merge queue with --merge."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("lane", help="lane name, e.g. fast or bulk")
+        parser.add_argument("--merge", action="store_true",
+                            help="consume the lane's merge queue instead")
+        parser.add_argument("--concurrency", type=int,
+                            help="override the lane's configured concurrency")
+        parser.add_argument("--loglevel", default="info")
+
+    def handle(self, *args, **options):
+        configured = lanes()
+        lane = configured.get(options["lane"])
+        if lane is None:
+            raise CommandError(
+                f"Unknown lane {options['lane']!r}; configured: {', '.join(configured)}"
+            )
+
+        if options["merge"]:
+            queue, concurrency, role = lane["merge_queue"], lane.get("merge_concurrency", 1), "merge"
+        else:
+            queue, concurrency, role = lane["queue"], lane.get("concurrency", 1), "import"
+        concurrency = options["concurrency"] or concurrency
+
+        self.stderr.write(f"Lane {options['lane']}: {queue} with concurrency {concurrency}")
+        celery_app.worker_main([
+            "worker",
+            "-Q", queue,
+            "-n", f"{options['lane']}_{role}@%h",
+            "-c", str(concurrency),
+            "-O", "fair",
+            "-l", options["loglevel"],
+        ])
@@ -0,0 +1,189 @@
+# catalog/metrics.py
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from django.conf import settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+# Samples are aggregated in-process and a background thread adds them to
+# these Redis hashes every METRICS_FLUSH_SECONDS, so web and worker processes
+# share one view without recording ever waiting on Redis.
+METRICS_KEY = "metrics:values"
+METRICS_TYPES_KEY = "metrics:types"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+_lock = threading.Lock()
+_pending = defaultdict(float)
+_types = {}
+_last_flush = time.monotonic()
+# pid of the process whose flusher thread is running
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(getattr(settings, "METRICS_FLUSH_SECONDS", 5))
+        flush(force=True)
+
+
+def _ensure_flusher():
+    """Start this process's flusher thread; threads do not survive a fork."""
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        threading.Thread(target=_flush_loop, name="metrics-flusher", daemon=True).start()
+        _flusher_pid = os.getpid()
+
+
+def _after_fork():
+    # the parent flushes what it had pending; the child must not count it again
+    global _lock, _flusher_lock
+    _lock, _flusher_lock = threading.Lock(), threading.Lock()
+    _pending.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+atexit.register(lambda: flush(force=True))
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    inner = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    return f"{name}{{{inner}}}"
+
+
+def _add(name, kind, series, amount):
+    with _lock:
+        _types[name] = kind
+        _pending[series] += amount
+    _ensure_flusher()
+
+
+def inc(name, amount=1, **labels):
+    """Increase a counter."""
+    _add(name, "counter", _series(name, labels), amount)
+
+
+def gauge_add(name, amount, **labels):
+    """Move a gauge up or down (e.g. open connections)."""
+    _add(name, "gauge", _series(name, labels), amount)
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    """Record one histogram sample."""
+    with _lock:
+        _types[name] = "histogram"
+        for bound in buckets:
+            # every bucket is touched so cumulative counts always render
+            _pending[_series(f"{name}_bucket", {**labels, "le": bound})] += 1 if value <= bound else 0
+        _pending[_series(f"{name}_bucket", {**labels, "le": "+Inf"})] += 1
+        _pending[_series(f"{name}_sum", labels)] += value
+        _pending[_series(f"{name}_count", labels)] += 1
+    _ensure_flusher()
+
+
+def flush(force=False):
+    global _last_flush
+    interval = getattr(settings, "METRICS_FLUSH_SECONDS", 5)
+    with _lock:
+        if not _pending or (not force and time.monotonic() - _last_flush < interval):
+            return
+        pending, types = dict(_pending), dict(_types)
+        _pending.clear()
+        _last_flush = time.monotonic()
+
+    try:
+        pipe = get_redis_connection("default").pipeline(transaction=False)
+        for series, amount in pending.items():
+            pipe.hincrbyfloat(METRICS_KEY, series, amount)
+        pipe.hset(METRICS_TYPES_KEY, mapping=types)
+        pipe.execute()
+    except Exception as e:
+        # metrics must never break the code path being measured
+        logger.warning("Failed to flush metrics: %s", e)
+
+
+def _base_name(series):
+    name = series.split("{", 1)[0]
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    flush(force=True)
+    r = get_redis_connection("default")
+    values = {k.decode() if isinstance(k, bytes) else k: float(v)
+              for k, v in r.hgetall(METRICS_KEY).items()}
+    types = {k.decode() if isinstance(k, bytes) else k: v.decode() if isinstance(v, bytes) else v
+             for k, v in r.hgetall(METRICS_TYPES_KEY).items()}
+
+    grouped = defaultdict(list)
+    for series, value in values.items():
+        name = _base_name(series)
+        if name not in types:
+            name = series.split("{", 1)[0]
+        grouped[name].append((series, value))
+
+    lines = []
+    for name in sorted(grouped):
+        lines.append(f"# TYPE {name} {types.get(name, 'untyped')}")
+        for series, value in sorted(grouped[name], key=lambda sv: _sort_key(sv[0])):
+            # repr() round-trips the float; :g would cut it to 6 digits
+            lines.append(f"{series} {value!r}")
+    return "\n".join(lines) + "\n"
+
+
+def _sort_key(series):
+    # order histogram buckets numerically with +Inf last
+    if 'le="' not in series:
+        return (series, 0.0)
+    head, le = series.split('le="', 1)
+    le = le.split('"', 1)[0]
+    return (head, float("inf") if le == "+Inf" else float(le))
+
+
+# ---------------------------------------------------------
+# PER-JOB PHASE TIMINGS (stored on UploadJob.metrics)
+# ---------------------------------------------------------
+def start_phase(job, phase):
+    job.metrics = {**(job.metrics or {}), phase: {"started_at": timezone.now().isoformat()}}
+    job.save(update_fields=["metrics"])
+
+
+def finish_phase(job, phase, rows):
+    """Close a phase started with start_phase() and record its throughput."""
+    entry = dict((job.metrics or {}).get(phase) or {})
+    if "ended_at" in entry:
+        return
+    ended = timezone.now()
+    started = entry.get("started_at")
+    seconds = (ended - datetime.fromisoformat(started)).total_seconds() if started else 0.0
+    entry.update({
+        "ended_at": ended.isoformat(),
+        "seconds": round(seconds, 3),
+        "rows": rows,
+        "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+    })
+    job.metrics = {**(job.metrics or {}), phase: entry}
+    job.save(update_fields=["metrics"])
+
+    observe("import_phase_seconds", seconds, phase=phase)
+    inc("import_phase_rows_total", rows, phase=phase)
+    flush(force=True)
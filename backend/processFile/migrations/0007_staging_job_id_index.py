@@ -0,0 +1,20 @@
+from django.db import migrations
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processFile', '0006_create_staging_v3'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            CREATE INDEX IF NOT EXISTS idx_staging_job_id ON product_import_staging(job_id, id);
+            DROP INDEX IF EXISTS idx_staging_job;
+            """,
+            reverse_sql="""
+            CREATE INDEX IF NOT EXISTS idx_staging_job ON product_import_staging(job_id);
+            DROP INDEX IF EXISTS idx_staging_job_id;
+            """
+        )
+    ]
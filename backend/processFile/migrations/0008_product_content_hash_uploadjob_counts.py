@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processFile', '0007_staging_job_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='uploadjob',
+            name='inserted_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='uploadjob',
+            name='unchanged_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='uploadjob',
+            name='updated_rows',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+class Migration(migrations.Migration):
+
+    # shipped as 0009_partition_staging; databases that applied it keep working
+    replaces = [
+        ('processFile', '0009_partition_staging'),
+    ]
+
+    dependencies = [
+        ('processFile', '0008_product_content_hash_uploadjob_counts'),
+    ]
+
+    # product_import_staging becomes a template that never holds rows: every
+    # job stages into its own UNLOGGED copy of it (see staging.py).
+    # Staging rows are transient: apply with the import workers stopped.
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            DROP TABLE IF EXISTS product_import_staging;
+            CREATE TABLE product_import_staging (
+                id BIGSERIAL PRIMARY KEY,
+                job_id UUID NOT NULL,
+                sku TEXT,
+                name TEXT,
+                description TEXT,
+                created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
+            );
+            """,
+            reverse_sql="""
+            DROP TABLE IF EXISTS product_import_staging;
+            CREATE TABLE product_import_staging (
+                id BIGSERIAL PRIMARY KEY,
+                job_id UUID NOT NULL,
+                sku TEXT,
+                name TEXT,
+                description TEXT,
+                created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
+            );
+            CREATE INDEX IF NOT EXISTS idx_staging_job_id ON product_import_staging(job_id, id);
+            """
+        )
+    ]
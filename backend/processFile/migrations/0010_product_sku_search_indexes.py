@@ -0,0 +1,26 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('processFile', '0009_staging_template'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='product',
+            index=GinIndex(OpClass(Lower('sku'), name='gin_trgm_ops'), name='product_sku_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(OpClass(Lower('sku'), name='text_pattern_ops'), name='product_sku_prefix'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processFile', '0010_product_sku_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadjob',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
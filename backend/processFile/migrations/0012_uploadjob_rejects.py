@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processFile', '0011_uploadjob_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadjob',
+            name='rejected_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='uploadjob',
+            name='rejects_path',
+            field=models.CharField(blank=True, max_length=1024, null=True),
+        ),
+    ]
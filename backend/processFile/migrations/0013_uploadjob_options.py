@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processFile', '0012_uploadjob_rejects'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadjob',
+            name='options',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
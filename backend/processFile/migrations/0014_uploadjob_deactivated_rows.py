@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processFile', '0013_uploadjob_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadjob',
+            name='deactivated_rows',
+            field=models.IntegerField(default=0),
+        ),
+    ]
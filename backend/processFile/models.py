@@ -1,14 +1,34 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
 from django.db.models.functions import Lower
+import hashlib
 import uuid
 
 class UploadJob(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     filename = models.CharField(max_length=512)
-    status = models.CharField(max_length=32, default="pending")  # pending/processing/staging_loaded/merging/completed/failed
+    status = models.CharField(max_length=32, default="pending")  # pending/uploading/parsing/staging/queued/importing/completed/failed
     total_rows = models.IntegerField(default=0)
     processed_rows = models.IntegerField(default=0)
+    inserted_rows = models.IntegerField(default=0)
+    updated_rows = models.IntegerField(default=0)
+    unchanged_rows = models.IntegerField(default=0)
+    # mirror imports: active products missing from the file, now inactive
+    deactivated_rows = models.IntegerField(default=0)
+    rejected_rows = models.IntegerField(default=0)
+    rejects_path = models.CharField(max_length=1024, blank=True, null=True)
+    # the uploaded file in MEDIA_ROOT, removed by the stale job reaper
+    file_path = models.CharField(max_length=1024, blank=True, null=True)
+    # import mode switches chosen at upload time, e.g. {"dedup": true, "mode": "mirror"}
+    options = models.JSONField(default=dict, blank=True)
+    # resume points of the import tasks (bytes/rows staged, last merged
+    # staging id, ...), committed together with the work they describe
+    checkpoint = models.JSONField(default=dict, blank=True)
+    # per-phase timings: {phase: {started_at, ended_at, seconds, rows, rows_per_sec}}
+    metrics = models.JSONField(default=dict, blank=True)
     error_message = models.TextField(blank=True, null=True)
+    # last sign of life from a worker (or an upload); see reaper.py
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -20,11 +40,30 @@ class Product(models.Model):
     sku = models.CharField(max_length=128, unique=True)
     description = models.TextField(blank=True)
     active = models.BooleanField(default=True)
+    # md5 of name + description, kept in sync with the merge SQL in tasks.py
+    content_hash = models.CharField(max_length=32, blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     class Meta:
         constraints = [
             models.UniqueConstraint(Lower('sku'), name='case_insensitive')
         ]
+        indexes = [
+            # substring search (LIKE '%x%') on lowercased sku, needs pg_trgm
+            GinIndex(OpClass(Lower('sku'), name='gin_trgm_ops'), name='product_sku_trgm'),
+            # prefix search (LIKE 'x%') regardless of the database collation
+            models.Index(OpClass(Lower('sku'), name='text_pattern_ops'), name='product_sku_prefix'),
+        ]
         def __str__(self):
-            return f"{self.sku} - {self.name}"
\ No newline at end of file
+            return f"{self.sku} - {self.name}"
+
+    @staticmethod
+    def compute_content_hash(name, description):
+        return hashlib.md5(f"{name or ''}\x1f{description or ''}".encode("utf-8")).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.content_hash = self.compute_content_hash(self.name, self.description)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"name", "description"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "content_hash"}
+        super().save(*args, **kwargs)
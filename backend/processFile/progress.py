@@ -1,8 +1,121 @@
+import asyncio
 import json
+import logging
+from django.conf import settings
 from django_redis import get_redis_connection
+from redis import asyncio as aioredis
 
-redis = get_redis_connection('default')
+logger = logging.getLogger(__name__)
 
-def publish_progress(task_id, payload):
-    r = get_redis_connection("default")
-    r.publish(f"progress_{task_id}", json.dumps(payload))
\ No newline at end of file
+
+def progress_channel(task_id):
+    return f"progress_{task_id}"
+
+
+def publish_progress(task_id, payload, r=None):
+    r = r or get_redis_connection("default")
+    r.publish(progress_channel(task_id), json.dumps(payload))
+
+
+def async_redis():
+    """Async client on the same Redis as the 'default' cache."""
+    return aioredis.Redis.from_url(settings.CACHES["default"]["LOCATION"], decode_responses=True)
+
+
+class ProgressHub:
+    """
+    Process-wide fan-out of progress pub/sub messages.
+
+    A single async pub/sub connection is shared by every SSE client in the
+    process; each channel is subscribed once, however many clients are
+    watching that job, and messages are copied into per-client queues.
+    """
+
+    QUEUE_SIZE = 100
+
+    def __init__(self):
+        self._listeners = {}
+        self._client = None
+        self._pubsub = None
+        self._reader = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, task_id):
+        channel = progress_channel(task_id)
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        async with self._lock:
+            await self._ensure_reader()
+            listeners = self._listeners.setdefault(channel, set())
+            if not listeners:
+                await self._pubsub.subscribe(channel)
+            listeners.add(queue)
+        return queue
+
+    async def snapshot(self, key):
+        """Read a progress hash over the shared async connection."""
+        async with self._lock:
+            await self._ensure_reader()
+        return await self._client.hgetall(key) or {}
+
+    async def unsubscribe(self, task_id, queue):
+        channel = progress_channel(task_id)
+        async with self._lock:
+            listeners = self._listeners.get(channel)
+            if listeners is None:
+                return
+            listeners.discard(queue)
+            if not listeners:
+                del self._listeners[channel]
+                try:
+                    await self._pubsub.unsubscribe(channel)
+                except Exception as e:
+                    logger.warning("Failed to unsubscribe from %s: %s", channel, e)
+
+    async def _ensure_reader(self):
+        if self._reader is not None and not self._reader.done():
+            return
+        await self._connect()
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def _connect(self):
+        if self._client is None:
+            self._client = async_redis()
+        self._pubsub = self._client.pubsub()
+        if self._listeners:
+            # reconnecting after a failure: restore existing subscriptions
+            await self._pubsub.subscribe(*self._listeners)
+
+    async def _read_loop(self):
+        while True:
+            try:
+                if not self._listeners:
+                    await asyncio.sleep(1.0)
+                    continue
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Progress pub/sub reader failed, reconnecting: %s", e)
+                await asyncio.sleep(1.0)
+                try:
+                    async with self._lock:
+                        await self._connect()
+                except Exception as e2:
+                    logger.warning("Progress pub/sub reconnect failed: %s", e2)
+                continue
+
+            if not message or message.get("type") != "message":
+                continue
+            try:
+                payload = json.loads(message["data"])
+            except (TypeError, ValueError):
+                continue
+
+            for queue in list(self._listeners.get(message["channel"], ())):
+                if queue.full():
+                    # slow client: drop its oldest update rather than block everyone
+                    queue.get_nowait()
+                queue.put_nowait(payload)
+
+
+hub = ProgressHub()
@@ -0,0 +1,171 @@
+# catalog/reaper.py
+import logging
+import os
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .locking import job_lock, lock_timed_out, set_lock_timeout
+from .metrics import inc
+from .models import UploadJob
+from .redis_utils import set_progress
+from .staging import STAGING_TABLE, drop_staging
+
+logger = logging.getLogger(__name__)
+
+# jobs waiting on a queue or a client, rather than on a running worker
+WAITING_STATUSES = ("pending", "queued", "uploading")
+RUNNING_STATUSES = ("parsing", "staging", "importing")
+FINISHED_STATUSES = ("completed", "failed")
+
+
+def _stale_jobs(now):
+    running = now - timedelta(seconds=getattr(settings, "IMPORT_STALE_SECONDS", 30 * 60))
+    waiting = now - timedelta(seconds=getattr(settings, "IMPORT_WAITING_STALE_SECONDS", 24 * 60 * 60))
+
+    def idle_since(cutoff):
+        # jobs that never beat are judged by when they were created
+        return Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, created_at__lt=cutoff)
+
+    return UploadJob.objects.filter(
+        (Q(status__in=RUNNING_STATUSES) & idle_since(running))
+        | (Q(status__in=WAITING_STATUSES) & idle_since(waiting))
+    ).order_by("created_at")
+
+
+def _staging_tables():
+    """{job id hex: bytes} for every per-job staging table that exists."""
+    prefix = f"{STAGING_TABLE}_"
+    with connection.cursor() as cur:
+        cur.execute(
+            """
+            SELECT relname, pg_total_relation_size(oid)
+            FROM pg_class
+            WHERE relkind = 'r' AND relname LIKE %s
+            """,
+            [prefix.replace("_", r"\_") + "%"],
+        )
+        return {name[len(prefix):]: size for name, size in cur.fetchall() if name.startswith(prefix)}
+
+
+def _drop_staging(job_id):
+    """
+    Drop a job's staging table unless that means waiting on a lock (someone
+    still reads it); the next run tries again. Returns whether it dropped.
+    """
+    try:
+        with transaction.atomic(), connection.cursor() as cur:
+            set_lock_timeout(cur, getattr(settings, "IMPORT_REAPER_LOCK_TIMEOUT", 5))
+            drop_staging(job_id)
+    except OperationalError as e:
+        if not lock_timed_out(e):
+            raise
+        logger.warning("Staging table of job %s is busy; not dropped", job_id)
+        return False
+    return True
+
+
+def _remove_file(path):
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except FileNotFoundError:
+        return 0
+    return size
+
+
+def reap(now=None):
+    """
+    Fail import jobs that no worker holds and that went silent (worker or
+    streaming client gone), and reclaim what dead jobs left behind:
+
+    - staging tables of stale, finished or deleted jobs (one constant-time
+      DROP each, so reclaiming never rewrites rows)
+    - uploads in MEDIA_ROOT that no unfinished job needs, once older than
+      IMPORT_ORPHAN_FILE_SECONDS (chunked uploads have no job until finalized)
+
+    A task holds its job's advisory lock for as long as it runs, so a job
+    is only judged by its heartbeat while nobody holds it; the reaper holds
+    it while reaping. Rejects files are kept. Returns a report of what was
+    reclaimed.
+    """
+    now = now or timezone.now()
+    report = {"jobs_failed": 0, "tables_dropped": 0, "files_removed": 0,
+              "staging_bytes": 0, "file_bytes": 0}
+    limit = getattr(settings, "IMPORT_REAPER_BATCH", 100)
+    tables = _staging_tables()
+
+    # 1. stale jobs -> failed; only if nobody holds or touched them meanwhile
+    for job in _stale_jobs(now)[:limit]:
+        with job_lock(job.id) as held:
+            if not held:
+                continue  # a worker is on it, however quiet
+            failed = UploadJob.objects.filter(
+                id=job.id, status=job.status, heartbeat_at=job.heartbeat_at,
+            ).update(
+                status="failed",
+                error_message=f"No heartbeat while {job.status}; reaped as stale",
+                # a redelivered task must start over: the staged rows are dropped
+                checkpoint={},
+                heartbeat_at=now,
+            )
+            if not failed:
+                continue
+            report["jobs_failed"] += 1
+            set_progress(job.id, status="failed", error="Import stalled and was abandoned")
+            size = tables.pop(job.id.hex, None)
+            if size is not None and _drop_staging(job.id):
+                report["tables_dropped"] += 1
+                report["staging_bytes"] += size
+            if job.file_path:
+                removed = _remove_file(job.file_path)
+                report["files_removed"] += bool(removed)
+                report["file_bytes"] += removed
+
+    # 2. staging tables nobody will merge: finished long enough ago, or no job at all
+    settled = now - timedelta(seconds=getattr(settings, "IMPORT_STALE_SECONDS", 30 * 60))
+    live = {
+        job_id.hex for job_id in UploadJob.objects.filter(
+            Q(status__in=RUNNING_STATUSES + WAITING_STATUSES)
+            | Q(heartbeat_at__gte=settled)
+        ).values_list("id", flat=True)
+    }
+    orphaned = [(hex_id, size) for hex_id, size in tables.items() if hex_id not in live]
+    for hex_id, size in orphaned[:limit]:
+        with job_lock(hex_id) as held:
+            if held and _drop_staging(hex_id):
+                report["tables_dropped"] += 1
+                report["staging_bytes"] += size
+
+    # 3. uploads no unfinished job refers to
+    media = settings.MEDIA_ROOT
+    if os.path.isdir(media):
+        cutoff = time.time() - getattr(settings, "IMPORT_ORPHAN_FILE_SECONDS", 24 * 60 * 60)
+        needed = set(
+            UploadJob.objects.filter(
+                ~Q(status__in=FINISHED_STATUSES) | Q(heartbeat_at__gte=settled)
+            ).exclude(file_path=None).values_list("file_path", flat=True)
+        )
+        with os.scandir(media) as entries:
+            for entry in entries:
+                # subdirectories (rejects/) are left alone
+                if not entry.is_file(follow_symlinks=False) or entry.path in needed:
+                    continue
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+                removed = _remove_file(entry.path)
+                report["files_removed"] += bool(removed)
+                report["file_bytes"] += removed
+
+    report["reclaimed_bytes"] = report["staging_bytes"] + report["file_bytes"]
+    inc("reaper_jobs_failed_total", report["jobs_failed"])
+    inc("reaper_reclaimed_bytes_total", report["staging_bytes"], kind="staging")
+    inc("reaper_reclaimed_bytes_total", report["file_bytes"], kind="files")
+    logger.info(
+        "Reaped %(jobs_failed)d stale job(s); dropped %(tables_dropped)d staging "
+        "table(s) and %(files_removed)d file(s), reclaiming %(reclaimed_bytes)d bytes",
+        report,
+    )
+    return report
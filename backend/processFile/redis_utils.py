@@ -1,30 +1,88 @@
 # catalog/redis_utils.py
 import logging
-import json
+import threading
+import time
 from django_redis import get_redis_connection
+from redis import ConnectionPool, Redis
 from django.conf import settings
+from .metrics import inc, observe
+from .progress import publish_progress
 
 logger = logging.getLogger(__name__)
 
+PROGRESS_TTL = 60*60*24
+
+# fallback pool, built once per process instead of a client per call
+_fallback_pool = None
+
+# per-job coalescing state: {key: {"flushed_at", "status", "pending"}}
+_coalesce = {}
+_coalesce_lock = threading.Lock()
+_last_sweep = 0.0
+
+
 # use the cache 'default' which you configured in settings (redis://127.0.0.1:6379/1)
 def _redis():
+    global _fallback_pool
     try:
         return get_redis_connection("default")
     except Exception as e:
         # fallback: try CELERY_RESULT_BACKEND URL if defined
         try:
-            from redis import Redis
-            url = getattr(settings, "CELERY_RESULT_BACKEND", None)
-            if url:
-                r = Redis.from_url(url, decode_responses=True)
-                logger.warning("Using fallback Redis via CELERY_RESULT_BACKEND")
-                return r
+            if _fallback_pool is None:
+                url = getattr(settings, "CELERY_RESULT_BACKEND", None)
+                if url:
+                    _fallback_pool = ConnectionPool.from_url(url, decode_responses=True)
+                    logger.warning("Using fallback Redis via CELERY_RESULT_BACKEND")
+            if _fallback_pool is not None:
+                return Redis(connection_pool=_fallback_pool)
         except Exception as e2:
             logger.exception("Fallback redis connection failed: %s", e2)
         logger.exception("Unable to get redis connection: %s", e)
         raise
 
-def set_progress(job_id, processed=None, total=None, status=None, error=None):
+def _coalesced(key, payload, force):
+    """
+    Merge `payload` into the job's pending update and decide whether to write.
+
+    Returns the payload to write now, or None when the update is held back
+    because the job was written less than PROGRESS_COALESCE_SECONDS ago.
+    Status changes, errors and forced updates are always written.
+    """
+    global _last_sweep
+    window = getattr(settings, "PROGRESS_COALESCE_SECONDS", 0.5)
+    now = time.monotonic()
+    with _coalesce_lock:
+        if now - _last_sweep >= window:
+            # jobs leave this process at any status (a phase 1 worker stops at
+            # "staging"), so forget every job that has been quiet for a window;
+            # its next update is then simply written straight away. Entries
+            # still holding back an update are kept, so it goes out with the next
+            # write instead of being lost.
+            for stale in [k for k, e in _coalesce.items()
+                          if not e["pending"] and now - e["flushed_at"] >= window]:
+                del _coalesce[stale]
+            _last_sweep = now
+        entry = _coalesce.get(key)
+        merged = {**entry["pending"], **payload} if entry else dict(payload)
+        status = payload.get("status", entry["status"] if entry else None)
+        urgent = (
+            force
+            or entry is None
+            or "error" in payload
+            or status != entry["status"]
+            or now - entry["flushed_at"] >= window
+        )
+        if not urgent:
+            entry["pending"] = merged
+            return None
+        if status in ("completed", "failed"):
+            _coalesce.pop(key, None)
+        else:
+            _coalesce[key] = {"flushed_at": now, "status": status, "pending": {}}
+        return merged
+
+def set_progress(job_id, processed=None, total=None, status=None, error=None, force=False):
     key = f"upload:{job_id}"
     payload = {}
     if processed is not None:
@@ -37,27 +95,53 @@ def set_progress(job_id, processed=None, total=None, status=None, error=None):
         payload['error'] = str(error)
     if not payload:
         return False
+    payload = _coalesced(key, payload, force)
+    if payload is None:
+        inc("progress_coalesced_total")
+        return True
+    started = time.monotonic()
     try:
         r = _redis()
-        # use hset mapping for convenience
-        r.hset(key, mapping=payload)
-        # set expiration so keys don't live forever
-        r.expire(key, 60*60*24)
+        # one round trip: write, expiry and the SSE notification
+        pipe = r.pipeline(transaction=False)
+        pipe.hset(key, mapping=payload)
+        pipe.expire(key, PROGRESS_TTL)
+        publish_progress(job_id, payload, pipe)
+        pipe.execute()
+        observe("progress_write_seconds", time.monotonic() - started)
         logger.debug("Set progress %s => %s", key, payload)
         return True
     except Exception as e:
+        inc("progress_errors_total")
         logger.exception("Failed to set progress for %s: %s", key, e)
         return False
 
-def get_progress(job_id):
+def incr_progress(job_id, processed=0, total=0, status=None):
+    """Atomically add to the counters of a job's progress hash (used by shards)."""
     key = f"upload:{job_id}"
     try:
         r = _redis()
-        data = r.hgetall(key)
-        # ensure keys are strings, not bytes
-        return {k.decode() if isinstance(k, bytes) else k:
-                v.decode() if isinstance(v, bytes) else v
-                for k, v in (data or {}).items()}
+        pipe = r.pipeline(transaction=False)
+        fields = []
+        if processed:
+            pipe.hincrby(key, "processed", int(processed))
+            fields.append("processed")
+        if total:
+            pipe.hincrby(key, "total", int(total))
+            fields.append("total")
+        if status is not None:
+            pipe.hset(key, "status", str(status))
+        pipe.expire(key, PROGRESS_TTL)
+        results = pipe.execute()
+
+        payload = {field: str(value) for field, value in zip(fields, results)}
+        if status is not None:
+            payload["status"] = str(status)
+        if payload:
+            # subscribers merge payloads, so publish the new absolute counters
+            publish_progress(job_id, payload, r)
+        logger.debug("Incremented progress %s by %s/%s", key, processed, total)
+        return True
     except Exception as e:
-        logger.exception("Failed to read progress for %s: %s", key, e)
-        return {}
+        logger.exception("Failed to increment progress for %s: %s", key, e)
+        return False
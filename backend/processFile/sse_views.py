@@ -1,40 +1,71 @@
 # catalog/sse_views.py
 import asyncio
 import json
-from django.http import StreamingHttpResponse
-from django.core.paginator import Paginator
-from .models import Product
-from .redis_utils import get_progress
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from .listing import (
+    catalog_version, cursor_for, decode_cursor, estimate_count, filter_products,
+    get_cached_listing, is_filtered, listing_cache_key, listing_etag, seek, set_cached_listing,
+)
+from .export import stream_copy_csv
+from .metrics import gauge_add, inc, observe
+from .progress import hub
 from django.views.decorators.http import require_GET
 from django.views.decorators.csrf import csrf_exempt
 
-async def _async_sleep(seconds):
-    await asyncio.sleep(seconds)
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+# seconds between SSE comments sent to keep idle connections open
+HEARTBEAT_SECONDS = 15
+
+
+def _event_payload(data):
+    return {
+        "status": data.get("status", "pending"),
+        "processed": int(data.get("processed") or 0),
+        "total": int(data.get("total") or 0),
+        "error": data.get("error"),
+    }
+
 
 def progress_stream(request, job_id):
 
     async def event_generator():
-        last = None
+        # Subscribe before the initial read so no update falls in between
+        queue = await hub.subscribe(job_id)
+        inc("sse_connections_total")
+        gauge_add("sse_connections_active", 1)
+        try:
+            state = await hub.snapshot(f"upload:{job_id}")
 
-        while True:
-            data = get_progress(job_id)
-            payload = {
-                "status": data.get("status", "pending"),
-                "processed": int(data.get("processed") or 0),
-                "total": int(data.get("total") or 0),
-                "error": data.get("error"),
-            }
+            last = None
+            while True:
+                payload = _event_payload(state)
 
-            if payload != last:
-                yield f"data: {json.dumps(payload)}\n\n"
-                last = payload
+                if payload != last:
+                    yield f"data: {json.dumps(payload)}\n\n"
+                    last = payload
 
-            if payload["status"] in ("completed", "failed"):
-                # send final event so EventSource can close
-                yield "data: [DONE]\n\n"
-                return   # <-- IMPORTANT: ends generator cleanly
+                if payload["status"] in ("completed", "failed"):
+                    # send final event so EventSource can close
+                    yield "data: [DONE]\n\n"
+                    return   # <-- IMPORTANT: ends generator cleanly
 
-            await _async_sleep(0.5)
+                try:
+                    update = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                state.update(update)
+        finally:
+            gauge_add("sse_connections_active", -1)
+            await hub.unsubscribe(job_id, queue)
 
     async def wrapper():
         async for chunk in event_generator():
@@ -45,44 +76,183 @@ def progress_stream(request, job_id):
     response["X-Accel-Buffering"] = "no"  # for nginx
     return response
 
+
+def _device_line(device):
+    return json.dumps({
+        "id": device.id,
+        "sku": device.sku,
+        "name": device.name,
+        "description": device.description,
+        "active": device.active,
+        "created_at": device.created_at.isoformat(),
+        "updated_at": device.updated_at.isoformat(),
+    }) + "\n"
+
+
+def _cached_response(entry):
+    response = HttpResponse(entry["body"], content_type="application/json")
+    for header, value in entry["headers"].items():
+        response[header] = value
+    return response
+
+
 @require_GET
 @csrf_exempt
 def stream_devices(request):
+    started = time.monotonic()
     page = int(request.GET.get("page", 1))
     limit = int(request.GET.get("limit", 100))
-    sku_filter = request.GET.get("sku", None)
-    active_filter = request.GET.get("active", None)
-
-    qs = Product.objects.all()
-
-    if sku_filter:
-        qs = qs.filter(sku__icontains=sku_filter)
-
-    if active_filter is not None:
-        if active_filter.lower() == "true":
-            qs = qs.filter(active=True)
-        elif active_filter.lower() == "false":
-            qs = qs.filter(active=False)
-    total_count = qs.count()
-    paginator = Paginator(qs, limit)
-    page_obj = paginator.get_page(page)
-    
-
-    def stream():
-        for device in page_obj.object_list:
-            data = {
-                "id": device.id,
-                "sku": device.sku,
-                "name": device.name,
-                "description": device.description,
-                "active": device.active,
-                "created_at": device.created_at.isoformat(),
-                "updated_at": device.updated_at.isoformat(),
-            }
-            yield json.dumps(data) + "\n"
-
-    response = StreamingHttpResponse(stream(), content_type="application/json")
-    response["X-Total-Count"] = str(total_count)
+    after = request.GET.get("after", None)
+    cursor = request.GET.get("cursor", None)
+    count_mode = request.GET.get("count", "exact")
+    mode = "keyset" if after is not None or cursor is not None else "page"
+
+    # Responses are versioned by the catalog: an unchanged catalog answers
+    # If-None-Match with a 304 and bounded pages come from the cache.
+    # Without a version (cache unreachable) both are skipped.
+    version = catalog_version()
+    etag = listing_etag(request.GET, version) if version is not None else None
+    if etag is not None:
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            inc("stream_devices_cache_total", result="not_modified")
+            return not_modified
+
+    cacheable = version is not None and limit <= getattr(settings, "LISTING_CACHE_MAX_LIMIT", 1000)
+    if cacheable:
+        cache_key = listing_cache_key(request.GET, version)
+        entry = get_cached_listing(cache_key)
+        if entry is not None:
+            inc("stream_devices_cache_total", result="hit")
+            response = _cached_response(entry)
+            response["ETag"] = etag
+            observe("stream_devices_seconds", time.monotonic() - started, mode=mode)
+            return response
+        inc("stream_devices_cache_total", result="miss")
+
+    qs = filter_products(request.GET)
+
+    next_cursor = None
+    if mode == "keyset":
+        # Keyset mode: seek on (rank, id) instead of OFFSET
+        try:
+            position = decode_cursor(cursor) if cursor else {"id": int(after)}
+            object_list = list(seek(qs, position)[:limit])
+        except ValueError:
+            return JsonResponse({"error": "Invalid cursor"}, status=400)
+        if len(object_list) == limit:
+            next_cursor = cursor_for(object_list[-1])
+    else:
+        # a plain slice: Paginator would COUNT on top of the total below
+        page = max(page, 1)
+        object_list = list(qs[(page - 1) * limit:page * limit])
+
+    if count_mode == "none":
+        total_count = None
+    elif count_mode == "estimate":
+        total_count = estimate_count(qs, is_filtered(request.GET))
+    else:
+        total_count = qs.count()
+
+    headers = {}
+    if total_count is not None:
+        headers["X-Total-Count"] = str(total_count)
+        if count_mode == "estimate":
+            headers["X-Total-Count-Estimated"] = "true"
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
     # Expose header for JS
-    response["Access-Control-Expose-Headers"] = "X-Total-Count"
-    return response
\ No newline at end of file
+    headers["Access-Control-Expose-Headers"] = "X-Total-Count, X-Total-Count-Estimated, X-Next-Cursor, ETag"
+
+    if cacheable:
+        entry = {"body": "".join(_device_line(device) for device in object_list), "headers": headers}
+        set_cached_listing(cache_key, entry)
+        response = _cached_response(entry)
+    else:
+        response = StreamingHttpResponse(
+            (_device_line(device) for device in object_list), content_type="application/json"
+        )
+        for header, value in headers.items():
+            response[header] = value
+    if etag is not None:
+        response["ETag"] = etag
+    observe("stream_devices_seconds", time.monotonic() - started, mode=mode)
+    return response
+
+
+DEVICE_FIELDS = ("id", "sku", "name", "description", "active", "created_at", "updated_at")
+# rows fetched per server-side cursor round trip / NDJSON lines per write
+STREAM_CHUNK_SIZE = 2000
+STREAM_FLUSH_ROWS = 500
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _ndjson_line(row):
+    if orjson is not None:
+        return orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(row, default=_json_default) + "\n").encode("utf-8")
+
+
+@require_GET
+@csrf_exempt
+async def stream_devices_ndjson(request):
+    """
+    Stream every matching product as NDJSON with constant memory.
+
+    Rows come from values() through a server-side cursor in chunks and are
+    flushed in batched writes; takes the same filters/cursor as stream_devices
+    plus an optional `limit`.
+    """
+    limit = request.GET.get("limit", None)
+    after = request.GET.get("after", None)
+    cursor = request.GET.get("cursor", None)
+
+    qs = filter_products(request.GET)
+    if after is not None or cursor is not None:
+        try:
+            position = decode_cursor(cursor) if cursor else {"id": int(after)}
+            qs = await sync_to_async(seek)(qs, position)
+        except ValueError:
+            return JsonResponse({"error": "Invalid cursor"}, status=400)
+    qs = qs.values(*DEVICE_FIELDS)
+    if limit is not None:
+        qs = qs[:int(limit)]
+
+    async def stream():
+        started = time.monotonic()
+        batch = []
+        async for row in qs.aiterator(chunk_size=STREAM_CHUNK_SIZE):
+            batch.append(_ndjson_line(row))
+            if len(batch) >= STREAM_FLUSH_ROWS:
+                yield b"".join(batch)
+                batch.clear()
+        if batch:
+            yield b"".join(batch)
+        observe("stream_devices_seconds", time.monotonic() - started, mode="ndjson")
+
+    return StreamingHttpResponse(stream(), content_type="application/x-ndjson")
+
+
+@require_GET
+@csrf_exempt
+async def export_devices(request):
+    """
+    Download products as CSV straight from COPY ... TO STDOUT, with the same
+    filters as stream_devices; `?gzip=1` compresses the stream on the fly.
+    """
+    compress = request.GET.get("gzip", "").lower() in ("1", "true")
+    qs = filter_products(request.GET)
+
+    response = StreamingHttpResponse(
+        stream_copy_csv(qs, compress=compress),
+        content_type="application/gzip" if compress else "text/csv",
+    )
+    filename = "products.csv.gz" if compress else "products.csv"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
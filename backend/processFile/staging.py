@@ -0,0 +1,35 @@
+# catalog/staging.py
+import uuid
+from django.db import connection
+
+# Template table; every job stages into its own standalone UNLOGGED copy of it
+STAGING_TABLE = "product_import_staging"
+
+
+def staging_table(job_id):
+    """Name of the table holding one job's staging rows."""
+    return f"{STAGING_TABLE}_{uuid.UUID(str(job_id)).hex}"
+
+
+def create_staging(job_id):
+    """
+    Create the job's staging table (idempotent, safe to call on retries).
+
+    The tables are not attached as partitions: ATTACH/CREATE ... PARTITION OF
+    and DROP of a partition take ACCESS EXCLUSIVE on the parent, which would
+    queue behind every other job's open COPY. LIKE only reads the template.
+    """
+    with connection.cursor() as cur:
+        cur.execute(
+            f"CREATE UNLOGGED TABLE IF NOT EXISTS {staging_table(job_id)} "
+            f"(LIKE {STAGING_TABLE} INCLUDING DEFAULTS, PRIMARY KEY (id))"
+        )
+
+
+def drop_staging(job_id):
+    """
+    Throw a job's staging rows away in constant time; only the job's own
+    table is locked.
+    """
+    with connection.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {staging_table(job_id)}")
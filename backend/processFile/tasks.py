@@ -1,16 +1,42 @@
 # catalog/tasks.py
 import csv
-import io
-from celery import shared_task, Task
-from django.db import connection
-from .models import UploadJob
-from .redis_utils import set_progress
+import logging
+import os
+import time
+from contextlib import nullcontext
+from itertools import chain, islice
+from uuid import UUID
+from celery import chord, group, shared_task, Task
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.db.models.lookups import In
+from django.utils import timezone
+from .listing import bump_catalog_version, filter_products
+from .lanes import import_queue, merge_queue
+from .locking import exclusive_merge_lock, job_lock, lock_batch, lock_timed_out
+from .reaper import reap
+from .metrics import finish_phase, inc, observe, start_phase
+from .models import Product, UploadJob
+from .redis_utils import set_progress, incr_progress
+from .dedup import LastWinsFilter, build_index
+from .copy_utils import (
+    MAGIC_BYTES, OffsetLines, copy_to_staging, detect_compression, iter_range_lines,
+    open_csv_binary, open_csv_text, read_header_line, shard_ranges,
+)
+from .staging import create_staging, drop_staging, staging_table
+from .validation import InvalidImportError, RowValidator, numbered, rejects_path_for, validate_header
 
 BATCH = 2000
 
+logger = logging.getLogger(__name__)
+
 
 class BaseTaskWithRetry(Task):
     autoretry_for = (Exception,)
+    # bad input fails the same way every time
+    dont_autoretry_for = (InvalidImportError,)
     retry_kwargs = {"max_retries": 3, "countdown": 5}
     retry_backoff = True
 
@@ -18,122 +44,669 @@ class BaseTaskWithRetry(Task):
 # ---------------------------------------------------------
 # PHASE 1 — PARSING CSV + STAGING INSERT
 # ---------------------------------------------------------
+def _shard_count(file_path, shards):
+    with open(file_path, "rb") as fh:
+        if detect_compression(fh.read(MAGIC_BYTES)):
+            return 1  # byte ranges of a compressed stream are not seekable
+    if shards is not None:
+        return max(int(shards), 1)
+    min_bytes = getattr(settings, "IMPORT_SHARD_MIN_BYTES", 256 * 1024 * 1024)
+    if os.path.getsize(file_path) < min_bytes:
+        return 1
+    return getattr(settings, "IMPORT_SHARDS", 8)
+
+
+def _fail_job(job, exc):
+    err_msg = str(exc)
+    job.status = "failed"
+    job.error_message = err_msg
+    # an autoretry may still resume this job: keep the reaper away for a while
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=["status", "error_message", "heartbeat_at"])
+    set_progress(job.id, status="failed", error=err_msg)
+
+
+def _beat(job_id):
+    UploadJob.objects.filter(id=job_id).update(heartbeat_at=timezone.now())
+
+
+def _save_checkpoint(job, **values):
+    """Record progress on the job; call inside the transaction that did the work."""
+    job.checkpoint = {**(job.checkpoint or {}), **values}
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=["checkpoint", "heartbeat_at"])
+
+
+def _segments(numbered_rows, size):
+    """Split an iterator of rows into consecutive lazy slices of `size` rows."""
+    numbered_rows = iter(numbered_rows)
+    for first in numbered_rows:
+        yield chain([first], islice(numbered_rows, size - 1))
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _rewind_rejects(path, size):
+    """Cut rejects written after the last checkpoint (by a failed attempt)."""
+    if size:
+        os.truncate(path, size)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
 @shared_task(bind=True, base=BaseTaskWithRetry)
-def process_csv_phase1(self, job_id, file_path):
+def process_csv_phase1(self, job_id, file_path, shards=None, merge=True):
+    with job_lock(job_id) as held:
+        if not held:
+            logger.info("Job %s is already being worked on; skipping duplicate phase 1", job_id)
+            return None
+        result, queued = _stage_file(job_id, file_path, shards, merge)
+    # published only once the lock is released: the merge takes it too, and
+    # would skip itself as a duplicate while phase 1 still held it
+    if queued is not None:
+        process_csv_phase2.apply_async(args=[job_id], queue=merge_queue(queued))
+    return result
+
+
+def _stage_file(job_id, file_path, shards, merge):
+    """
+    Stage the file (or dispatch its shards). Returns the task result and,
+    when the merge is up next, the job it must be enqueued for.
+    """
     job = UploadJob.objects.get(id=job_id)
+    if job.status == "completed":
+        return None, None  # duplicate delivery of an import that already finished
+    # a retry resumes after the last committed segment
+    checkpoint = job.checkpoint or {}
 
     # ❗ Start parsing phase
     job.status = "parsing"
-    job.save(update_fields=["status"])
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=["status", "heartbeat_at"])
     set_progress(job_id, processed=0, total=0, status="parsing")
 
-    rows = 0
+    dedup = bool((job.options or {}).get("dedup"))
 
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            header = next(reader)
-
-            # Prepare temp CSV
-            out = io.StringIO()
-            writer = csv.writer(out)
-            writer.writerow(["job_id"] + header)
-
-            # 🔥 PARSING PROGRESS (real-time)
-            for row in reader:
-                writer.writerow([job_id] + row)
-                rows += 1
+        # parsing and COPY overlap (rows are streamed), so they are timed as one phase
+        if not checkpoint:
+            start_phase(job, "staging")
+        create_staging(job_id)
 
-                if rows % 5000 == 0:
-                    set_progress(job_id, processed=rows, total=rows, status="parsing")
+        # last-wins dedup needs one view of the whole file
+        shards = 1 if dedup else _shard_count(file_path, shards)
+        if shards > 1:
+            ranges = shard_ranges(file_path, shards)
+            if len(ranges) > 1:
+                return _dispatch_shards(job, file_path, ranges, merge), None
 
-            out.seek(0)
+        with open_csv_binary(file_path) as fh:
+            header, header_end = read_header_line(fh)
+            if not header:
+                raise InvalidImportError("Empty file")
+            header = validate_header(header)
 
             # Switch status to staging
             job.status = "staging"
             job.save(update_fields=["status"])
 
-            copy_sql = f"""
-                COPY product_import_staging (job_id, {", ".join(header)})
-                FROM STDIN WITH CSV HEADER
-            """
+            rows = checkpoint.get("rows", 0)
+            rejected = checkpoint.get("rejected", 0)
+            dropped = checkpoint.get("duplicates_dropped", 0)
+            rejects_path = rejects_path_for(job_id)
+            _rewind_rejects(rejects_path, checkpoint.get("rejects_bytes", 0))
 
-            # Perform COPY
-            with connection.cursor() as cur:
-                cur.copy_expert(copy_sql, out)
+            # 🔥 PARSING PROGRESS (real-time, reported while COPY consumes rows)
+            def report(count):
+                set_progress(job_id, processed=rows + count, total=rows + count, status="parsing")
+
+            # Rows are validated and streamed into COPY, never held in memory
+            # all at once; bad rows go to the job's rejects file instead.
+            # Every IMPORT_CHECKPOINT_ROWS rows the COPY commits together with
+            # the byte offset reached, so a retry skips what is already staged.
+            lines = OffsetLines(fh, checkpoint.get("offset", header_end))
+            reader = csv.reader(lines)
+            start_line = checkpoint.get("line", 1)
+            validator = RowValidator(header, rejects_path)
+            index = dedup_filter = None
+            try:
+                if dedup:
+                    # first pass: last line of every sku; second pass keeps only those
+                    with open_csv_text(file_path) as first_pass:
+                        first_reader = csv.reader(first_pass)
+                        next(first_reader)
+                        index = build_index(numbered(first_reader), validator)
+                    dedup_filter = LastWinsFilter(index, validator)
+
+                segment_rows = getattr(settings, "IMPORT_CHECKPOINT_ROWS", 500_000)
+                parsed = numbered(reader, start_line, on_error=validator.reject_unparsable)
+                for segment in _segments(parsed, segment_rows):
+                    if dedup_filter is not None:
+                        segment = dedup_filter.filter(segment)
+                    with transaction.atomic(), connection.cursor() as cur:
+                        rows += copy_to_staging(
+                            cur, job_id, header, validator.filter(segment), on_progress=report
+                        )
+                        _save_checkpoint(
+                            job,
+                            offset=lines.offset,
+                            line=start_line + reader.line_num,
+                            rows=rows,
+                            rejected=rejected + validator.rejected,
+                            rejects_bytes=_file_size(rejects_path),
+                            duplicates_dropped=dropped + (dedup_filter.dropped if dedup_filter else 0),
+                        )
+            finally:
+                validator.close()
+                if index is not None:
+                    index.close()
 
         # Finish phase
+        rejected += validator.rejected
         job.total_rows = rows
         job.processed_rows = rows
-        job.save(update_fields=["total_rows", "processed_rows"])
+        job.rejected_rows = rejected
+        job.rejects_path = rejects_path if rejected else None
+        job.save(update_fields=["total_rows", "processed_rows", "rejected_rows", "rejects_path"])
+        finish_phase(job, "staging", rows)
+        if dedup_filter is not None:
+            job.metrics["staging"]["duplicates_dropped"] = dropped + dedup_filter.dropped
+            job.save(update_fields=["metrics"])
 
         # 🔥 FINISHED STAGING
         set_progress(job_id, processed=rows, total=rows, status="staging")
 
     except Exception as exc:
-        err_msg = str(exc)
-        job.status = "failed"
-        job.error_message = err_msg
-        job.save(update_fields=["status", "error_message"])
-        set_progress(job_id, status="failed", error=err_msg)
+        _fail_job(job, exc)
         raise
 
     # ---------------------------------------------------------
     # Move to PHASE 2
     # ---------------------------------------------------------
-    from .tasks import process_csv_phase2
-    process_csv_phase2.apply_async(args=[job_id], queue="imports_merge")
+    if not merge:
+        return rows, None
+    # waiting for a merge worker is not stalling; the reaper gives it longer
+    job.status = "queued"
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=["status", "heartbeat_at"])
+    return rows, job
+
+
+def _dispatch_shards(job, file_path, ranges, merge=True):
+    """Fan byte ranges out as shard tasks; phase 2 fires once all are staged."""
+    with open(file_path, "rb") as fh:
+        header, _ = read_header_line(fh)
+    header = validate_header(header)
+
+    # the first shard to start moves the job on to "staging", the last one
+    # to commit moves it back to "queued" for the merge
+    job.status = "queued"
+    job.heartbeat_at = timezone.now()
+    if not (job.checkpoint or {}).get("shards_done"):
+        # a re-dispatch keeps the counts of shards that already committed
+        job.total_rows = 0
+        job.processed_rows = 0
+        job.rejected_rows = 0
+    job.checkpoint = {**(job.checkpoint or {}), "shards": len(ranges)}
+    job.save(update_fields=[
+        "status", "heartbeat_at", "total_rows", "processed_rows", "rejected_rows", "checkpoint",
+    ])
+
+    job_id = str(job.id)
+    set_progress(job_id, processed=0, total=0, status="staging")
+    shard_tasks = [
+        process_csv_shard.si(job_id, file_path, header, start, end).set(queue=import_queue(job))
+        for start, end in ranges
+    ]
+    if not merge:
+        group(shard_tasks)()
+        return len(shard_tasks)
+    chord(shard_tasks)(process_csv_phase2.si(job_id).set(queue=merge_queue(job)))
+    return len(shard_tasks)
+
+
+# ---------------------------------------------------------
+# PHASE 1 (SHARDED) — ONE BYTE RANGE PER TASK
+# ---------------------------------------------------------
+def _job_checkpoint(job_id, lock=False):
+    qs = UploadJob.objects.filter(id=job_id)
+    if lock:
+        qs = qs.select_for_update()
+    return qs.values_list("checkpoint", flat=True).get() or {}
+
+
+@shared_task(bind=True, base=BaseTaskWithRetry)
+def process_csv_shard(self, job_id, file_path, header, start, end):
+    # shards of one job run side by side, but never next to one of its phases;
+    # waiting (instead of skipping) keeps the chord from firing early
+    with job_lock(job_id, shared=True, block=True):
+        return _stage_shard(job_id, file_path, header, start, end)
+
+
+def _stage_shard(job_id, file_path, header, start, end):
+    reported = {"rows": 0}
+
+    def report(count):
+        delta = count - reported["rows"]
+        reported["rows"] = count
+        incr_progress(job_id, processed=delta, total=delta)
+
+    started = time.monotonic()
+    try:
+        # One COPY per shard: a retried shard never leaves partial rows behind,
+        # and one that already committed is skipped
+        if start in _job_checkpoint(job_id).get("shards_done", []):
+            return 0
+        UploadJob.objects.filter(id=job_id, status="queued").update(
+            status="staging", heartbeat_at=timezone.now(),
+        )
+        validator = RowValidator(header, rejects_path_for(job_id), line_prefix=f"{start}:")
+        with open(file_path, "rb") as fh, transaction.atomic():
+            reader = csv.reader(iter_range_lines(fh, start, end))
+            parsed = numbered(reader, on_error=validator.reject_unparsable)
+            try:
+                with connection.cursor() as cur:
+                    rows = copy_to_staging(
+                        cur, job_id, header, validator.filter(parsed), on_progress=report
+                    )
+            finally:
+                validator.close()
+
+            counts = {
+                "total_rows": F("total_rows") + rows,
+                "processed_rows": F("processed_rows") + rows,
+                "heartbeat_at": timezone.now(),
+            }
+            if validator.rejected:
+                counts["rejected_rows"] = F("rejected_rows") + validator.rejected
+                counts["rejects_path"] = validator.rejects_path
+            # the job row stays locked until commit, so shards record
+            # themselves one at a time and a duplicate run rolls back
+            checkpoint = _job_checkpoint(job_id, lock=True)
+            if start in checkpoint.get("shards_done", []):
+                transaction.set_rollback(True)
+                return 0
+            shards_done = checkpoint.get("shards_done", []) + [start]
+            counts["checkpoint"] = {**checkpoint, "shards_done": shards_done}
+            if len(shards_done) == checkpoint.get("shards"):
+                # fully staged: waiting for the merge is not stalling
+                counts["status"] = "queued"
+            UploadJob.objects.filter(id=job_id).update(**counts)
+
+        remaining = rows - reported["rows"]
+        incr_progress(job_id, processed=remaining, total=remaining)
+        observe("import_shard_seconds", time.monotonic() - started)
+        inc("import_phase_rows_total", rows, phase="shard")
+
+    except Exception as exc:
+        _fail_job(UploadJob.objects.get(id=job_id), exc)
+        raise
+
+    return rows
 
 
 # ---------------------------------------------------------
 # PHASE 2 — MERGE INTO MAIN TABLE
 # ---------------------------------------------------------
+# Must match Product.compute_content_hash
+CONTENT_HASH_SQL = "md5(coalesce(name, '') || chr(31) || coalesce(description, ''))"
+
+MERGE_BATCH_SQL = """
+    WITH src AS (
+        {source}
+    ),
+    merged AS (
+        INSERT INTO "processFile_product"
+        (sku, name, description, content_hash, active, created_at, updated_at)
+        SELECT sku, name, description, {content_hash}, TRUE, now(), now()
+        FROM src
+        ON CONFLICT (sku) DO UPDATE SET
+            name=EXCLUDED.name,
+            description=EXCLUDED.description,
+            content_hash=EXCLUDED.content_hash,
+            active=EXCLUDED.active,
+            updated_at=now()
+        {where}
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT
+        (SELECT count(*) FROM src),
+        count(*) FILTER (WHERE inserted),
+        count(*) FILTER (WHERE NOT inserted)
+    FROM merged;
+"""
+
+# Last row per sku wins. Kept for dedup imports too: phase 1 only drops
+# exact duplicates, and ON CONFLICT cannot touch one row twice per batch.
+# The LOWER(sku) order is also the order rows get locked in, which keeps
+# concurrent merges from deadlocking (see lock_batch()).
+DISTINCT_SOURCE_SQL = """
+        SELECT DISTINCT ON (LOWER(sku))
+            LOWER(sku) AS sku, name, description
+        FROM {staging}
+        WHERE job_id = %s AND id > %s AND id <= %s
+        ORDER BY LOWER(sku), id DESC
+"""
+
+# Rows whose content and active flag already match are left untouched
+SKIP_UNCHANGED_SQL = """
+        WHERE "processFile_product".content_hash IS DISTINCT FROM EXCLUDED.content_hash
+           OR NOT "processFile_product".active
+"""
+
+
+def _merge_sql(job_id, skip_unchanged):
+    return MERGE_BATCH_SQL.format(
+        source=DISTINCT_SOURCE_SQL.format(staging=staging_table(job_id)),
+        content_hash=CONTENT_HASH_SQL,
+        where=SKIP_UNCHANGED_SQL if skip_unchanged else "",
+    )
+
+
+# ---------------------------------------------------------
+# MIRROR IMPORTS: the file is the full catalog, so active
+# products missing from it are deactivated after the merge
+# ---------------------------------------------------------
+MIRROR_MISSING_SQL = """
+    CREATE TEMPORARY TABLE {missing} AS
+    SELECT p.id FROM "processFile_product" p
+    WHERE p.active
+      AND NOT EXISTS (
+          SELECT 1 FROM {staging} s
+          WHERE s.job_id = %s AND LOWER(s.sku) = LOWER(p.sku)
+      )
+"""
+
+DEACTIVATE_BATCH_SQL = """
+    WITH batch AS (
+        SELECT id FROM {missing} WHERE id > %s ORDER BY id LIMIT %s
+    ),
+    deactivated AS (
+        UPDATE "processFile_product" p SET active = FALSE, updated_at = now()
+        FROM batch WHERE p.id = batch.id AND p.active
+        RETURNING p.id
+    )
+    SELECT (SELECT max(id) FROM batch), (SELECT count(*) FROM batch), count(*)
+    FROM deactivated;
+"""
+
+
+def _mirror_missing(job, staging, missing):
+    """
+    Collect the active products absent from the staged file into the temp
+    table `missing` (one anti-join) and enforce the deactivation threshold.
+    Must run under exclusive_merge_lock(). Returns the number of missing products.
+    """
+    options = job.options or {}
+    if job.rejected_rows:
+        raise InvalidImportError(
+            f"Mirror import refused: {job.rejected_rows} row(s) were rejected, "
+            "so the file is not a complete catalog"
+        )
+
+    limit = options.get("max_deactivate_pct")
+    if limit is None:
+        limit = getattr(settings, "IMPORT_MIRROR_MAX_DEACTIVATE_PCT", 10)
+
+    with connection.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {missing}")
+        cur.execute(MIRROR_MISSING_SQL.format(missing=missing, staging=staging), [str(job.id)])
+        cur.execute(f"ALTER TABLE {missing} ADD PRIMARY KEY (id)")
+        cur.execute(f"SELECT count(*) FROM {missing}")
+        count = cur.fetchone()[0]
+        cur.execute('SELECT count(*) FROM "processFile_product" WHERE active')
+        active = cur.fetchone()[0]
+
+    pct = count * 100 / active if active else 0
+    if pct > limit:
+        raise InvalidImportError(
+            f"Mirror import would deactivate {count} of {active} active products "
+            f"({pct:.1f}%), above the {limit:g}% limit"
+        )
+    return count
+
+
+def _deactivate_missing(job, missing, total, batch_size):
+    job_id = str(job.id)
+    checkpoint = job.checkpoint or {}
+    deactivated = checkpoint.get("deactivated", 0)
+    last_id = checkpoint.get("deactivate_after_id", 0)
+    processed = 0
+    sql = DEACTIVATE_BATCH_SQL.format(missing=missing)
+    set_progress(job_id, processed=0, total=total, status="deactivating")
+    while True:
+        with transaction.atomic(), connection.cursor() as cur:
+            cur.execute(sql, [last_id, batch_size])
+            upper_id, count, changed = cur.fetchone()
+            if not count:
+                break
+            deactivated += changed
+            last_id = upper_id
+            _save_checkpoint(job, deactivate_after_id=last_id, deactivated=deactivated)
+        processed += count
+        set_progress(job_id, processed=processed, total=total, status="deactivating")
+    return deactivated
+
+
 @shared_task(bind=True, base=BaseTaskWithRetry)
 def process_csv_phase2(self, job_id):
+    with job_lock(job_id) as held:
+        if not held:
+            logger.info("Job %s is already being worked on; skipping duplicate merge", job_id)
+            return None
+        return _merge_job(job_id)
+
+
+def _merge_job(job_id):
+    # read under the job lock, so a run that just finished is seen
     job = UploadJob.objects.get(id=job_id)
+    if job.status == "completed":
+        return  # duplicate delivery of a merge that already finished
+
+    # a retry resumes after the last committed merge batch
+    checkpoint = job.checkpoint or {}
 
     # 🔥 Start importing phase
     job.status = "importing"
-    job.save(update_fields=["status"])
-    set_progress(job_id, status="importing", processed=0, total=1)
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=["status", "heartbeat_at"])
+    # sharded and streamed uploads finish staging right before the merge
+    finish_phase(job, "staging", job.total_rows)
+
+    batch_size = getattr(settings, "IMPORT_MERGE_BATCH", BATCH)
+    staging = staging_table(job_id)
+    mirror = (job.options or {}).get("mode") == "mirror"
+    missing = f"mirror_missing_{UUID(str(job_id)).hex}"
+    merge_sql = _merge_sql(job_id, getattr(settings, "IMPORT_SKIP_UNCHANGED", True))
+
+    processed = checkpoint.get("merged_rows", 0)
+    last_id = checkpoint.get("merge_after_id", 0)
+    inserted = checkpoint.get("inserted", 0)
+    updated = checkpoint.get("updated", 0)
+    unchanged = checkpoint.get("unchanged", 0)
+    deactivated = checkpoint.get("deactivated", 0)
 
     try:
-        with connection.cursor() as cur:
-            merge_sql = """
-                INSERT INTO "processFile_product"
-                (sku, name, description, active, created_at, updated_at)
-                SELECT DISTINCT ON (LOWER(sku))
-                    LOWER(sku), name, description, TRUE, now(), now()
-                FROM product_import_staging
-                WHERE job_id = %s
-                ORDER BY LOWER(sku), id DESC
-                ON CONFLICT (sku) DO UPDATE SET
-                    name=EXCLUDED.name,
-                    description=EXCLUDED.description,
-                    active=EXCLUDED.active,
-                    updated_at=now();
-            """
-            cur.execute(merge_sql, [job_id])
-
-        # 🔥 100% importing done
-        set_progress(job_id, processed=1, total=1, status="importing")
-
-        # Cleanup staging
-        with connection.cursor() as cur:
-            cur.execute("DELETE FROM product_import_staging WHERE job_id = %s", [job_id])
+        if not checkpoint.get("merge_done"):
+            if "merge_after_id" not in checkpoint:
+                start_phase(job, "merge")
+            with connection.cursor() as cur:
+                cur.execute(f"SELECT count(*) FROM {staging} WHERE job_id = %s", [job_id])
+                total = cur.fetchone()[0]
+            set_progress(job_id, status="importing", processed=0, total=total)
+
+            # Batches of different jobs run side by side, only waiting for each
+            # other on common skus. Mirror imports touch skus outside the file
+            # too, so they keep every other merge out until they are done.
+            with exclusive_merge_lock(on_wait=lambda: _beat(job_id)) if mirror else nullcontext():
+                if mirror:
+                    # checked before anything is merged, so an aborted mirror import
+                    # leaves the catalog untouched
+                    to_deactivate = _mirror_missing(job, staging, missing)
+
+                # Walk the staging rows in id order; ascending batches keep last-wins
+                # semantics across batches, DISTINCT ON keeps them within one.
+                # Each batch commits together with its checkpoint.
+                while True:
+                    try:
+                        with transaction.atomic(), connection.cursor() as cur:
+                            cur.execute(
+                                f"""
+                                SELECT max(id), count(*) FROM (
+                                    SELECT id FROM {staging}
+                                    WHERE job_id = %s AND id > %s
+                                    ORDER BY id
+                                    LIMIT %s
+                                ) batch
+                                """,
+                                [job_id, last_id, batch_size],
+                            )
+                            upper_id, count = cur.fetchone()
+                            if not count:
+                                break
+
+                            if not mirror:
+                                lock_batch(cur)
+                            cur.execute(merge_sql, [job_id, last_id, upper_id])
+                            distinct, batch_inserted, batch_updated = cur.fetchone()
+
+                            inserted += batch_inserted
+                            updated += batch_updated
+                            unchanged += distinct - batch_inserted - batch_updated
+                            last_id = upper_id
+                            processed += count
+                            _save_checkpoint(
+                                job, merge_after_id=last_id, merged_rows=processed,
+                                inserted=inserted, updated=updated, unchanged=unchanged,
+                            )
+                    except OperationalError as e:
+                        if not lock_timed_out(e):
+                            raise
+                        # another merge holds some of these rows: beat, retry
+                        _beat(job_id)
+                        continue
+                    set_progress(job_id, processed=processed, total=total, status="importing")
+
+                finish_phase(job, "merge", processed)
+
+                if mirror:
+                    start_phase(job, "deactivate")
+                    deactivated = _deactivate_missing(job, missing, to_deactivate, batch_size)
+                    finish_phase(job, "deactivate", to_deactivate)
+
+            _save_checkpoint(job, merge_done=True)
+
+        # Cleanup staging (constant-time table drop)
+        start_phase(job, "cleanup")
+        drop_staging(job_id)
+        finish_phase(job, "cleanup", processed)
 
         # Completed
         job.status = "completed"
         job.processed_rows = job.total_rows
-        job.save(update_fields=["status", "processed_rows"])
+        job.inserted_rows = inserted
+        job.updated_rows = updated
+        job.unchanged_rows = unchanged
+        job.deactivated_rows = deactivated
+        job.save(update_fields=[
+            "status", "processed_rows", "inserted_rows", "updated_rows", "unchanged_rows",
+            "deactivated_rows",
+        ])
+        bump_catalog_version()
 
         # Final SSE push
         set_progress(job_id, processed=job.total_rows, total=job.total_rows, status="completed")
 
     except Exception as exc:
-        err_msg = str(exc)
-        job.status = "failed"
-        job.error_message = err_msg
-        job.save(update_fields=["status", "error_message"])
-        set_progress(job_id, status="failed", error=err_msg)
+        # batches merged before the failure are already committed
+        bump_catalog_version()
+        _fail_job(job, exc)
         raise
+
+    finally:
+        if mirror:
+            with connection.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {missing}")
+
+
+# ---------------------------------------------------------
+# BULK PRODUCT STATUS UPDATES
+# ---------------------------------------------------------
+def bulk_set_active(active, ids=None, skus=None, filters=None, on_progress=None):
+    """
+    Set `active` on many products with batched, set-based UPDATEs.
+
+    Targets are given as product ids, skus (case-insensitive) or the
+    stream_devices query filters. Rows already in the requested state are
+    skipped. Returns the number of rows changed.
+    """
+    updated = 0
+    processed = 0
+
+    def _apply(qs):
+        return qs.exclude(active=active).update(active=active, updated_at=timezone.now())
+
+    if filters is not None:
+        qs = filter_products(filters).order_by("id")
+        total = qs.count()
+        last_id = 0
+        while True:
+            batch = list(qs.filter(id__gt=last_id).values_list("id", flat=True)[:BATCH])
+            if not batch:
+                break
+            updated += _apply(Product.objects.filter(id__in=batch))
+            last_id = batch[-1]
+            processed += len(batch)
+            if on_progress:
+                on_progress(processed, total)
+        if updated:
+            bump_catalog_version()
+        return updated
+
+    if ids is not None:
+        keys, lookup = list(ids), lambda chunk: Product.objects.filter(id__in=chunk)
+    else:
+        keys = [str(sku).lower() for sku in skus or []]
+        lookup = lambda chunk: Product.objects.filter(In(Lower("sku"), chunk))
+
+    total = len(keys)
+    for i in range(0, total, BATCH):
+        chunk = keys[i:i + BATCH]
+        updated += _apply(lookup(chunk))
+        processed += len(chunk)
+        if on_progress:
+            on_progress(processed, total)
+    if updated:
+        bump_catalog_version()
+    return updated
+
+
+# short and idempotent, so safe to redeliver if the worker dies mid-run
+@shared_task(bind=True, base=BaseTaskWithRetry, acks_late=True)
+def bulk_update_product_status(self, job_id, active, ids=None, skus=None, filters=None):
+    set_progress(job_id, processed=0, total=0, status="updating")
+
+    def report(processed, total):
+        set_progress(job_id, processed=processed, total=total, status="updating")
+
+    try:
+        updated = bulk_set_active(active, ids=ids, skus=skus, filters=filters, on_progress=report)
+    except Exception as exc:
+        set_progress(job_id, status="failed", error=str(exc))
+        raise
+
+    set_progress(job_id, status="completed")
+    return updated
+
+
+# ---------------------------------------------------------
+# MAINTENANCE — STALE JOBS, ORPHANED STAGING AND UPLOADS
+# ---------------------------------------------------------
+@shared_task(acks_late=True)
+def reap_stale_jobs():
+    return reap()
@@ -0,0 +1,75 @@
+# catalog/tests/helpers.py
+import csv
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import uuid
+from django.test import override_settings
+
+HEADER = ["sku", "name", "description"]
+# per-process cache, so tests neither need Redis nor see each other's entries
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class TempDirMixin:
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def write_csv(self, rows, name="catalog.csv", compress=False, header=HEADER):
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(header)
+        writer.writerows(rows)
+        data = out.getvalue().encode("utf-8")
+        path = os.path.join(self.tmp, name)
+        with (gzip.open if compress else open)(path, "wb") as fh:
+            fh.write(data)
+        return path
+
+
+def multiline_rows(count):
+    # quoted newlines, doubled quotes and lines that look like records
+    tricky = 'line one\nx{0},evil,"row"\n"quoted" {0}'
+    return [
+        [f"sku{i}", f"name {i}", tricky.format(i) if i % 3 == 0 else f"plain {i}"]
+        for i in range(count)
+    ]
+
+
+class ImportMixin(TempDirMixin):
+    """Runs both import phases eagerly, the way benchmark_import does."""
+
+    def setUp(self):
+        super().setUp()
+        media = override_settings(MEDIA_ROOT=self.tmp)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def run_import(self, rows, header=HEADER, **options):
+        return self.import_file(self.write_import(rows, header), **options)
+
+    def write_import(self, rows, header=HEADER):
+        return self.write_csv(rows, name=f"import-{uuid.uuid4().hex}.csv", header=header)
+
+    def stage_file(self, path, **options):
+        """Phase 1 only; the job is left queued for the merge."""
+        from ..models import UploadJob
+        from ..tasks import process_csv_phase1
+
+        job = UploadJob.objects.create(filename=os.path.basename(path), options=options)
+        process_csv_phase1.apply(args=[str(job.id), path], kwargs={"merge": False})
+        job.refresh_from_db()
+        return job
+
+    def import_file(self, path, **options):
+        from ..tasks import process_csv_phase2
+
+        job = self.stage_file(path, **options)
+        if job.status != "failed":
+            process_csv_phase2.apply(args=[str(job.id)])
+            job.refresh_from_db()
+        return job
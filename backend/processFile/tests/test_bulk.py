@@ -0,0 +1,64 @@
+# catalog/tests/test_bulk.py
+import json
+from unittest import mock
+from django.test import TestCase
+from ..models import Product
+from ..tasks import bulk_update_product_status
+
+URL = "/products/devices/bulk-update-status/"
+
+
+class BulkStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(6):
+            Product.objects.create(sku=f"SKU-{i}", name=f"Name {i}", active=i % 2 == 0)
+
+    def post(self, body):
+        return self.client.post(URL, json.dumps(body), content_type="application/json")
+
+    def active_skus(self):
+        return sorted(Product.objects.filter(active=True).values_list("sku", flat=True))
+
+    def test_ids_are_updated_inline_and_noops_skipped(self):
+        ids = list(Product.objects.filter(sku__in=["SKU-0", "SKU-1"]).values_list("id", flat=True))
+        response = self.post({"active": False, "ids": ids})
+        self.assertEqual(response.json(), {"updated": 1})
+        self.assertEqual(self.active_skus(), ["SKU-2", "SKU-4"])
+
+    def test_skus_match_case_insensitively(self):
+        response = self.post({"active": True, "skus": ["sku-1", "Sku-3", "missing"]})
+        self.assertEqual(response.json(), {"updated": 2})
+        self.assertEqual(self.active_skus(), ["SKU-0", "SKU-1", "SKU-2", "SKU-3", "SKU-4"])
+
+    def test_large_lists_run_in_the_background(self):
+        with self.settings(BULK_STATUS_SYNC_LIMIT=1), \
+                mock.patch.object(bulk_update_product_status, "apply_async") as enqueue:
+            response = self.post({"active": True, "skus": ["sku-1", "sku-3"]})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(enqueue.call_args.kwargs["args"], [response.json()["job_id"], True])
+
+    def test_filter_runs_in_the_background(self):
+        def run_eagerly(args, kwargs, **options):
+            return bulk_update_product_status.apply(args=args, kwargs=kwargs)
+
+        with mock.patch.object(bulk_update_product_status, "apply_async", side_effect=run_eagerly):
+            response = self.post({"active": False, "filter": {"sku": "sku-", "active": "true"}})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.active_skus(), [])
+
+    def test_filters_must_narrow_the_selection(self):
+        for filters in ({}, {"match": "prefix"}, {"sku": ""}, {"skus": "a"},
+                        {"active": False}, {"active": "maybe"}, {"sku": "a", "match": "regex"}, []):
+            with self.subTest(filter=filters), \
+                    mock.patch.object(bulk_update_product_status, "apply_async") as enqueue:
+                response = self.post({"active": False, "filter": filters})
+                self.assertEqual(response.status_code, 400)
+                enqueue.assert_not_called()
+        self.assertEqual(self.active_skus(), ["SKU-0", "SKU-2", "SKU-4"])
+
+    def test_exactly_one_target(self):
+        for body in ({"active": True}, {"active": True, "ids": [1], "skus": ["a"]},
+                     {"active": "yes", "ids": [1]}):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
@@ -0,0 +1,35 @@
+# catalog/tests/test_copy.py
+import csv
+import io
+from django.test import SimpleTestCase
+from ..copy_utils import IteratorFile, staging_lines
+from .helpers import HEADER
+
+
+class IteratorFileTests(SimpleTestCase):
+    def test_read_returns_requested_sizes_in_order(self):
+        chunks = ["abc", "defgh", "", "ij"]
+        fh = IteratorFile(chunks)
+        self.assertEqual(fh.read(2), "ab")
+        self.assertEqual(fh.read(4), "cdef")
+        self.assertEqual(fh.read(100), "ghij")
+        self.assertEqual(fh.read(10), "")
+
+    def test_pulls_chunks_lazily(self):
+        pulled = []
+
+        def chunks():
+            for chunk in ("aa", "bb", "cc"):
+                pulled.append(chunk)
+                yield chunk
+
+        fh = IteratorFile(chunks())
+        fh.read(2)
+        self.assertEqual(pulled, ["aa"])
+
+    def test_staging_lines_round_trip(self):
+        rows = [["a", "x,y", 'say "hi"'], ["b", "", "two\nlines"]]
+        text = "".join(staging_lines("job", HEADER, iter(rows)))
+        parsed = list(csv.reader(io.StringIO(text)))
+        self.assertEqual(parsed[0], ["job_id"] + HEADER)
+        self.assertEqual(parsed[1:], [["job"] + row for row in rows])
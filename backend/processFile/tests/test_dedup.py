@@ -0,0 +1,64 @@
+# catalog/tests/test_dedup.py
+import os
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..dedup import LastWinsFilter, LastWinsIndex, build_index
+from ..models import Product
+from ..validation import RowValidator
+from .helpers import HEADER, ImportMixin, TempDirMixin
+
+
+class DedupTests(TempDirMixin, SimpleTestCase):
+    ROWS = [
+        (2, ["A", "first", ""]),
+        (3, ["a", "case variant", ""]),
+        (4, ["B", "only", ""]),
+        (5, ["A", "last", ""]),
+        (6, ["ΑΣ", "greek", ""]),
+        (7, ["ας", "greek lower", ""]),
+        (8, ["", "invalid", ""]),
+    ]
+
+    def dedup(self, max_keys):
+        validator = RowValidator(HEADER, os.path.join(self.tmp, "rejects.csv"))
+        with override_settings(IMPORT_DEDUP_MAX_KEYS=max_keys):
+            index = build_index(self.ROWS, validator)
+        try:
+            dedup_filter = LastWinsFilter(index, validator, batch=3)
+            kept = [line for line, _ in dedup_filter.filter(self.ROWS)]
+        finally:
+            index.close()
+        return kept, dedup_filter.dropped
+
+    def test_last_exact_duplicate_wins(self):
+        # case variants are left for the merge's DISTINCT ON (LOWER(sku))
+        self.assertEqual(self.dedup(100), ([3, 4, 5, 6, 7, 8], 1))
+
+    def test_spilled_index_gives_the_same_result(self):
+        self.assertEqual(self.dedup(2), self.dedup(100))
+
+    def test_index_spill_keeps_last_line(self):
+        index = LastWinsIndex(max_keys=2)
+        try:
+            for line, key in enumerate(["x", "y", "z", "x", "y", "x"]):
+                index.add(key, line)
+            index.finish()
+            self.assertIsNotNone(index._db)
+            self.assertEqual(index.last_lines(["x", "y", "z", "w"]), {"x": 5, "y": 4, "z": 2})
+        finally:
+            index.close()
+        self.assertIsNone(index._db)
+
+
+class DedupImportTests(ImportMixin, TestCase):
+    def test_dedup_import_keeps_the_last_row(self):
+        job = self.run_import([
+            ["A", "first", ""],
+            ["b", "only", ""],
+            ["a", "case variant", ""],
+            ["A", "last", ""],
+        ], dedup=True)
+        self.assertEqual(job.status, "completed")
+        # the exact repeat of "A" is dropped before staging, "a" by the merge
+        self.assertEqual(job.metrics["staging"]["duplicates_dropped"], 1)
+        self.assertEqual(job.total_rows, 3)
+        self.assertEqual(dict(Product.objects.values_list("sku", "name")), {"a": "last", "b": "only"})
@@ -0,0 +1,46 @@
+# catalog/tests/test_export.py
+import asyncio
+import csv
+import gzip
+import io
+import threading
+from django.test import TransactionTestCase
+from ..export import EXPORT_FIELDS, stream_copy_csv
+from ..models import Product
+
+
+def _export_threads():
+    return [t for t in threading.enumerate() if t.name == "product-export"]
+
+
+class ExportTests(TransactionTestCase):
+    # COPY runs on the export thread's own connection, so rows must be committed
+    def setUp(self):
+        Product.objects.bulk_create(
+            Product(sku=f"sku-{i}", name=f"Name {i}", description="x" * 200) for i in range(2000)
+        )
+
+    async def download(self, **params):
+        response = await self.async_client.get("/products/devices/export/", params)
+        self.assertTrue(response.is_async)
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    async def test_export_streams_csv(self):
+        rows = list(csv.reader(io.StringIO((await self.download(sku="sku-1")).decode())))
+        self.assertEqual(rows[0], list(EXPORT_FIELDS))
+        self.assertEqual(len(rows) - 1, 1 + 10 + 100 + 1000)  # sku-1, sku-1x, sku-1xx, sku-1xxx
+
+    async def test_gzip_export(self):
+        data = gzip.decompress(await self.download(gzip="1"))
+        self.assertEqual(data.count(b"\n"), 2001)
+
+    async def test_abandoned_export_stops_the_copy(self):
+        stream = stream_copy_csv(Product.objects.all(), max_chunks=1)
+        self.assertTrue(await stream.__anext__())
+        await stream.aclose()
+        # the producer notices within one put timeout and closes its connection
+        for _ in range(50):
+            if not _export_threads():
+                break
+            await asyncio.sleep(0.1)
+        self.assertEqual(_export_threads(), [])
@@ -0,0 +1,64 @@
+# catalog/tests/test_jobs.py
+import threading
+from unittest import mock
+from django.db import connection
+from django.test import TransactionTestCase
+from ..models import Product, UploadJob
+from ..reaper import reap
+from ..tasks import process_csv_phase1, process_csv_phase2
+from .helpers import ImportMixin, multiline_rows
+
+
+def _in_worker(task, **kwargs):
+    """Run `task` eagerly on its own thread and connection, like another worker would."""
+    def run():
+        try:
+            task.apply(**kwargs)
+        finally:
+            connection.close()
+
+    worker = threading.Thread(target=run)
+    worker.start()
+    worker.join(30)
+
+
+class PhaseHandoffTests(ImportMixin, TransactionTestCase):
+    def test_merge_enqueued_by_phase_one_is_not_a_duplicate(self):
+        path = self.write_import([["a", "A", ""], ["b", "B", ""]])
+        job = UploadJob.objects.create(filename="catalog.csv")
+
+        # a merge worker that picks the task up the moment it is published
+        def deliver(args, **options):
+            _in_worker(process_csv_phase2, args=args)
+
+        with mock.patch.object(process_csv_phase2, "apply_async", side_effect=deliver):
+            process_csv_phase1.apply(args=[str(job.id), path], kwargs={"shards": 1})
+        job.refresh_from_db()
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(Product.objects.count(), 2)
+
+
+class ShardedStagingTests(ImportMixin, TransactionTestCase):
+    def test_last_shard_hands_the_job_to_the_merge(self):
+        path = self.write_import(multiline_rows(30))
+        job = UploadJob.objects.create(filename="catalog.csv")
+        with mock.patch("processFile.tasks.group") as group:
+            result = process_csv_phase1.apply(
+                args=[str(job.id), path], kwargs={"shards": 3, "merge": False},
+            )
+        self.assertEqual(result.get(), 3)
+        shards = group.call_args.args[0]
+
+        statuses = []
+        for shard in shards:
+            shard.apply()
+            job.refresh_from_db()
+            statuses.append(job.status)
+        self.assertEqual(statuses, ["staging", "staging", "queued"])
+        self.assertEqual(job.total_rows, 30)
+
+        # waiting for a merge worker is not stalling
+        with self.settings(IMPORT_STALE_SECONDS=0):
+            reap()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "queued")
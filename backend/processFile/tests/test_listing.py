@@ -0,0 +1,99 @@
+# catalog/tests/test_listing.py
+import json
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from .. import listing
+from ..listing import decode_cursor, encode_cursor
+from ..models import Product
+from .helpers import LOCMEM_CACHES
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        position = {"id": 42, "rank": 1}
+        self.assertEqual(decode_cursor(encode_cursor(position)), position)
+
+    def test_malformed_cursors_raise_value_error(self):
+        for token in ("", "not base64!", encode_cursor([1]), encode_cursor({"id": "1"}),
+                      encode_cursor({"rank": 0})):
+            with self.subTest(token=token), self.assertRaises(ValueError):
+                decode_cursor(token)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PageListingTests(TestCase):
+    url = "/products/devices/stream/"
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            Product.objects.create(sku=f"sku-{i}", name=f"Name {i}")
+
+    def setUp(self):
+        cache.clear()
+
+    def skus(self, response):
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return [json.loads(line)["sku"] for line in body.decode().splitlines()]
+
+    def test_page_is_a_slice_with_a_single_count(self):
+        with self.assertNumQueries(2):  # the page and the total
+            response = self.client.get(self.url, {"page": 2, "limit": 2})
+        self.assertEqual(response["X-Total-Count"], "5")
+        expected = list(Product.objects.order_by("id").values_list("sku", flat=True))[2:4]
+        self.assertEqual(self.skus(response), expected)
+
+    def test_pages_past_the_end_are_empty(self):
+        response = self.client.get(self.url, {"page": 9, "limit": 2})
+        self.assertEqual(self.skus(response), [])
+        self.assertEqual(response["X-Total-Count"], "5")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ListingCacheTests(TestCase):
+    url = "/products/devices/stream/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(sku="sku-1", name="Name 1")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_catalog_answers_304(self):
+        etag = self.client.get(self.url, {"limit": 10})["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {"limit": 10}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        # other parameters are another representation
+        response = self.client.get(self.url, {"limit": 20}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_pages_are_served_from_the_cache(self):
+        first = self.client.get(self.url, {"limit": 10})
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, {"limit": 10})
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["X-Total-Count"], "1")
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(self.url, {"limit": 10})["ETag"]
+        self.client.post(
+            f"/products/device/{self.product.id}/update-status/",
+            json.dumps({"active": False}), content_type="application/json",
+        )
+        response = self.client.get(self.url, {"limit": 10}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertFalse(json.loads(response.content)["active"])
+
+    def test_listings_work_without_the_cache(self):
+        with mock.patch.object(listing, "cache") as broken, \
+                self.assertLogs("processFile.listing", "WARNING"):
+            broken.get.side_effect = broken.set.side_effect = ConnectionError("down")
+            response = self.client.get(self.url, {"limit": 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertEqual(response["X-Total-Count"], "1")
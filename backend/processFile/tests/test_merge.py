@@ -0,0 +1,109 @@
+# catalog/tests/test_merge.py
+import threading
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from ..locking import lock_batch
+from ..models import Product
+from ..tasks import process_csv_phase2
+from .helpers import ImportMixin
+
+
+class MergeTests(ImportMixin, TestCase):
+    def test_counts_inserts_and_updates(self):
+        Product.objects.create(sku="old", name="Old", description="")
+        job = self.run_import([
+            ["old", "Old renamed", ""],
+            ["new-1", "New 1", "first"],
+            ["new-2", "New 2", ""],
+        ])
+        self.assertEqual(job.status, "completed")
+        self.assertEqual((job.total_rows, job.inserted_rows, job.updated_rows), (3, 2, 1))
+        self.assertEqual(Product.objects.get(sku="old").name, "Old renamed")
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_last_row_per_sku_wins_across_batches(self):
+        rows = [[f"SKU-{i % 5}", f"name {i}", ""] for i in range(23)]
+        with self.settings(IMPORT_MERGE_BATCH=4):
+            job = self.run_import(rows)
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(job.total_rows, 23)
+        self.assertEqual(Product.objects.count(), 5)
+        # skus are stored lowercased; the last of the 23 rows named each one
+        self.assertEqual(
+            dict(Product.objects.values_list("sku", "name")),
+            {f"sku-{i % 5}": f"name {i}" for i in range(18, 23)},
+        )
+
+
+class SkipUnchangedTests(ImportMixin, TestCase):
+    def test_reimport_leaves_unchanged_rows_alone(self):
+        rows = [[f"sku-{i}", f"name {i}", "same"] for i in range(4)]
+        self.run_import(rows)
+
+        rows[2][1] = "renamed"
+        job = self.run_import(rows)
+        self.assertEqual(job.status, "completed")
+        self.assertEqual((job.inserted_rows, job.updated_rows, job.unchanged_rows), (0, 1, 3))
+        self.assertEqual(Product.objects.get(sku="sku-2").name, "renamed")
+
+    def test_sql_hash_matches_the_model(self):
+        self.run_import([["a", "Name, with comma", "multi\nline"], ["b", "B", ""]])
+        for product in Product.objects.all():
+            with self.subTest(sku=product.sku):
+                self.assertEqual(
+                    product.content_hash,
+                    Product.compute_content_hash(product.name, product.description),
+                )
+
+    def test_inactive_products_are_reactivated(self):
+        self.run_import([["a", "A", ""]])
+        Product.objects.filter(sku="a").update(active=False)
+        job = self.run_import([["a", "A", ""]])
+        self.assertEqual(job.updated_rows, 1)
+        self.assertTrue(Product.objects.get(sku="a").active)
+
+
+class ConcurrentMergeTests(ImportMixin, TransactionTestCase):
+    def merge_in_thread(self, job):
+        def run():
+            try:
+                process_csv_phase2.apply(args=[str(job.id)])
+            finally:
+                connection.close()
+
+        worker = threading.Thread(target=run)
+        worker.start()
+        self.addCleanup(worker.join, 10)
+        return worker
+
+    def test_disjoint_merges_overlap(self):
+        job = self.stage_file(self.write_import([[f"b-{i}", "B", ""] for i in range(50)]))
+        # another job's merge batch, still open
+        with transaction.atomic(), connection.cursor() as cur:
+            lock_batch(cur)
+            for i in range(50):
+                Product.objects.create(sku=f"a-{i}", name="A")
+            worker = self.merge_in_thread(job)
+            worker.join(10)
+            self.assertFalse(worker.is_alive())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.inserted_rows), ("completed", 50))
+        self.assertEqual(Product.objects.count(), 100)
+
+    @override_settings(MERGE_LOCK_WAIT_SECONDS=0.2)
+    def test_common_skus_wait_for_the_other_merge(self):
+        job = self.stage_file(self.write_import([["shared", "from the file", ""], ["b-1", "B", ""]]))
+        with transaction.atomic(), connection.cursor() as cur:
+            lock_batch(cur)
+            Product.objects.create(sku="shared", name="in flight")
+            worker = self.merge_in_thread(job)
+            worker.join(1)
+            # still retrying its batch, beating every MERGE_LOCK_WAIT_SECONDS
+            self.assertTrue(worker.is_alive())
+        worker.join(10)
+        self.assertFalse(worker.is_alive())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.inserted_rows, job.updated_rows), ("completed", 1, 1))
+        self.assertEqual(Product.objects.get(sku="shared").name, "from the file")
@@ -0,0 +1,18 @@
+# catalog/tests/test_metrics.py
+from unittest import mock
+from django.test import SimpleTestCase
+from .. import metrics
+
+
+class RenderTests(SimpleTestCase):
+    def test_values_keep_full_precision(self):
+        redis = mock.Mock()
+        redis.hgetall.side_effect = lambda key: {
+            metrics.METRICS_KEY: {b"import_rows_total": b"123456789", b"merge_seconds_sum": b"0.1234567891"},
+            metrics.METRICS_TYPES_KEY: {b"import_rows_total": b"counter", b"merge_seconds": b"histogram"},
+        }[key]
+        with mock.patch.object(metrics, "get_redis_connection", return_value=redis), \
+                mock.patch.object(metrics, "flush"):
+            lines = metrics.render().splitlines()
+        self.assertIn("import_rows_total 123456789.0", lines)
+        self.assertIn("merge_seconds_sum 0.1234567891", lines)
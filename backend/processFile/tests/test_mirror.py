@@ -0,0 +1,48 @@
+# catalog/tests/test_mirror.py
+from django.test import TestCase
+from ..models import Product
+from .helpers import ImportMixin
+
+
+class MirrorImportTests(ImportMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(10):
+            Product.objects.create(sku=f"sku-{i}", name=f"Name {i}")
+        Product.objects.create(sku="retired", name="Retired", active=False)
+
+    def mirror(self, keep, **options):
+        rows = [[f"sku-{i}", f"Name {i}", ""] for i in range(keep)] + [["new", "New", ""]]
+        return self.run_import(rows, mode="mirror", **options)
+
+    def inactive_skus(self):
+        return sorted(Product.objects.filter(active=False).values_list("sku", flat=True))
+
+    def test_products_missing_from_the_file_are_deactivated(self):
+        job = self.mirror(9)  # 1 of 10 active products missing: at the 10% limit
+        self.assertEqual(job.status, "completed", job.error_message)
+        self.assertEqual((job.inserted_rows, job.deactivated_rows), (1, 1))
+        self.assertEqual(self.inactive_skus(), ["retired", "sku-9"])
+
+    def test_too_many_deactivations_abort_before_merging(self):
+        job = self.mirror(8)
+        self.assertEqual(job.status, "failed")
+        self.assertIn("above the 10% limit", job.error_message)
+        self.assertEqual(self.inactive_skus(), ["retired"])
+        self.assertFalse(Product.objects.filter(sku="new").exists())
+
+    def test_upload_can_raise_the_limit(self):
+        job = self.mirror(5, max_deactivate_pct=50)
+        self.assertEqual(job.status, "completed", job.error_message)
+        self.assertEqual(job.deactivated_rows, 5)
+
+    def test_upload_can_lower_the_limit(self):
+        job = self.mirror(9, max_deactivate_pct=5)
+        self.assertEqual(job.status, "failed")
+
+    def test_rejected_rows_refuse_the_mirror(self):
+        job = self.run_import([["", "no sku", ""]] + [[f"sku-{i}", "", ""] for i in range(10)],
+                              mode="mirror")
+        self.assertEqual(job.status, "failed")
+        self.assertIn("rejected", job.error_message)
+        self.assertEqual(self.inactive_skus(), ["retired"])
@@ -0,0 +1,53 @@
+# catalog/tests/test_progress.py
+from django.test import SimpleTestCase, override_settings
+from .. import redis_utils
+
+
+@override_settings(PROGRESS_COALESCE_SECONDS=10)
+class CoalesceTests(SimpleTestCase):
+    def setUp(self):
+        redis_utils._coalesce.clear()
+        self.addCleanup(redis_utils._coalesce.clear)
+
+    def age(self, key, seconds):
+        redis_utils._coalesce[key]["flushed_at"] -= seconds
+        redis_utils._last_sweep -= seconds
+
+    def test_updates_within_the_window_are_merged(self):
+        self.assertEqual(
+            redis_utils._coalesced("k", {"processed": "1", "status": "parsing"}, False),
+            {"processed": "1", "status": "parsing"},
+        )
+        self.assertIsNone(redis_utils._coalesced("k", {"processed": "2"}, False))
+        self.assertIsNone(redis_utils._coalesced("k", {"total": "9"}, False))
+        self.assertEqual(
+            redis_utils._coalesced("k", {"processed": "3"}, True),
+            {"processed": "3", "total": "9"},
+        )
+
+    def test_status_changes_and_errors_are_written_at_once(self):
+        redis_utils._coalesced("k", {"status": "parsing"}, False)
+        self.assertEqual(redis_utils._coalesced("k", {"status": "staging"}, False),
+                         {"status": "staging"})
+        self.assertEqual(redis_utils._coalesced("k", {"error": "boom"}, False),
+                         {"error": "boom"})
+
+    def test_finished_jobs_are_forgotten(self):
+        redis_utils._coalesced("k", {"status": "parsing"}, False)
+        redis_utils._coalesced("k", {"status": "completed"}, False)
+        self.assertNotIn("k", redis_utils._coalesce)
+
+    def test_idle_entries_are_evicted(self):
+        redis_utils._coalesced("idle", {"status": "staging"}, False)
+        self.age("idle", 60)
+        redis_utils._coalesced("other", {"status": "parsing"}, False)
+        self.assertNotIn("idle", redis_utils._coalesce)
+
+    def test_held_back_update_survives_the_sweep(self):
+        redis_utils._coalesced("k", {"processed": "1", "status": "importing"}, False)
+        self.assertIsNone(redis_utils._coalesced("k", {"processed": "5"}, False))
+        self.age("k", 60)
+        self.assertEqual(
+            redis_utils._coalesced("k", {"status": "completed"}, False),
+            {"processed": "5", "status": "completed"},
+        )
@@ -0,0 +1,78 @@
+# catalog/tests/test_resume.py
+import csv
+import gzip
+from unittest import mock
+from django.test import SimpleTestCase, TestCase
+from .. import tasks
+from ..copy_utils import OffsetLines, read_header_line
+from ..models import Product
+from ..tasks import _segments
+from ..validation import numbered
+from .helpers import ImportMixin, TempDirMixin, multiline_rows
+
+
+class ResumeTests(TempDirMixin, SimpleTestCase):
+    def read_segments(self, path, offset, line, size, stop_after=None):
+        """Rows per committed segment, plus the checkpoint after each one."""
+        segments = []
+        with (gzip.open if path.endswith(".gz") else open)(path, "rb") as fh:
+            if offset is None:
+                _, offset = read_header_line(fh)
+            lines = OffsetLines(fh, offset)
+            reader = csv.reader(lines)
+            for segment in _segments(numbered(reader, line), size):
+                rows = [row for _, row in segment]
+                segments.append((rows, lines.offset, line + reader.line_num))
+                if stop_after is not None and len(segments) == stop_after:
+                    break
+        return segments
+
+    def check_resume(self, path, rows):
+        first = self.read_segments(path, None, 1, 7, stop_after=2)
+        self.assertEqual(sum(len(r) for r, _, _ in first), 14)
+        _, offset, line = first[-1]
+        rest = self.read_segments(path, offset, line, 7)
+        resumed = [row for r, _, _ in first + rest for row in r]
+        self.assertEqual(resumed, rows)
+        # the line count keeps matching the file across the resume
+        self.assertEqual(rest[-1][2], 1 + sum(1 + row[2].count("\n") for row in rows))
+
+    def test_resume_from_checkpoint(self):
+        rows = multiline_rows(30)
+        self.check_resume(self.write_csv(rows), rows)
+
+    def test_resume_compressed(self):
+        rows = multiline_rows(30)
+        self.check_resume(self.write_csv(rows, name="catalog.csv.gz", compress=True), rows)
+
+    def test_segments_are_consecutive_slices(self):
+        segments = [list(s) for s in _segments(range(10), 4)]
+        self.assertEqual(segments, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+
+
+class ResumeImportTests(ImportMixin, TestCase):
+    def test_retry_resumes_after_the_last_checkpoint(self):
+        rows = [[f"sku-{i}", f"Name {i}", ""] for i in range(12)]
+        rows[11][0] = ""  # rejected in the segment that fails
+        copies = []
+
+        def flaky_copy(cur, job_id, header, rows, on_progress=None):
+            rows = list(rows)
+            copies.append(len(rows))
+            if len(copies) == 3:
+                raise ConnectionError("worker lost")
+            return real_copy(cur, job_id, header, rows, on_progress)
+
+        real_copy = tasks.copy_to_staging
+        with self.settings(IMPORT_CHECKPOINT_ROWS=5), \
+                mock.patch.object(tasks, "copy_to_staging", side_effect=flaky_copy):
+            job = self.run_import(rows)
+
+        # the retry starts with the segment that failed, not the whole file
+        self.assertEqual(copies, [5, 5, 1, 1])
+        self.assertEqual(job.status, "completed", job.error_message)
+        self.assertEqual((job.total_rows, job.rejected_rows), (11, 1))
+        self.assertEqual(Product.objects.count(), 11)
+        # the rejects of the failed attempt were cut, not written twice
+        with open(job.rejects_path, newline="") as fh:
+            self.assertEqual(len(list(csv.reader(fh))), 2)
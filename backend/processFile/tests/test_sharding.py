@@ -0,0 +1,41 @@
+# catalog/tests/test_sharding.py
+import csv
+import os
+from django.test import SimpleTestCase
+from ..copy_utils import iter_range_lines, read_header_line, shard_ranges
+from .helpers import TempDirMixin, multiline_rows
+
+
+class ShardRangesTests(TempDirMixin, SimpleTestCase):
+    def parse_ranges(self, path, ranges):
+        rows = []
+        with open(path, "rb") as fh:
+            for start, end in ranges:
+                rows.extend(csv.reader(iter_range_lines(fh, start, end)))
+        return rows
+
+    def test_ranges_keep_quoted_newlines_together(self):
+        rows = multiline_rows(200)
+        path = self.write_csv(rows)
+        for shards in (2, 3, 5, 7, 8, 13):
+            with self.subTest(shards=shards):
+                ranges = shard_ranges(path, shards, block=64)
+                self.assertLessEqual(len(ranges), shards)
+                self.assertEqual(self.parse_ranges(path, ranges), rows)
+
+    def test_ranges_are_contiguous_and_cover_the_data(self):
+        path = self.write_csv(multiline_rows(50))
+        with open(path, "rb") as fh:
+            _, header_end = read_header_line(fh)
+        ranges = shard_ranges(path, 4)
+        self.assertEqual(ranges[0][0], header_end)
+        self.assertEqual(ranges[-1][1], os.path.getsize(path))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+
+    def test_more_shards_than_records(self):
+        rows = multiline_rows(2)
+        path = self.write_csv(rows)
+        ranges = shard_ranges(path, 10)
+        self.assertLessEqual(len(ranges), 2)
+        self.assertEqual(self.parse_ranges(path, ranges), rows)
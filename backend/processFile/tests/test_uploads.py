@@ -0,0 +1,119 @@
+# catalog/tests/test_uploads.py
+import hashlib
+import io
+import json
+from unittest import mock
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from ..copy_utils import last_record_end
+from ..models import UploadJob
+from ..staging import staging_table
+from .. import views
+from .helpers import ImportMixin
+
+DATA = b'sku,name,description\na,A,"first\nsecond"\nb,B,plain\nc,C,"last"\n'
+
+
+class LastRecordEndTests(SimpleTestCase):
+    def test_last_record_end_defers_open_quotes(self):
+        data = b'sku,name,description\na,b,"first\nsecond"\nc,d,"open\n'
+        with io.BytesIO(data) as fh:
+            header_end = data.index(b"\n") + 1
+            end = last_record_end(fh, header_end, len(data))
+            self.assertEqual(data[header_end:end], b'a,b,"first\nsecond"\n')
+            # nothing complete after that point
+            self.assertEqual(last_record_end(fh, end, len(data)), end)
+
+
+@mock.patch("processFile.views.process_csv_phase2.apply_async")
+@mock.patch("processFile.views.process_csv_phase1.apply_async")
+class ChunkedUploadTests(ImportMixin, TestCase):
+    def init(self, **body):
+        response = self.client.post(
+            "/products/upload/chunked/",
+            json.dumps({"filename": "catalog.csv", "size": len(DATA), **body}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put(self, upload_id, offset, chunk):
+        return self.client.put(
+            f"/products/upload/chunked/{upload_id}/?offset={offset}", chunk,
+            content_type="application/octet-stream",
+        )
+
+    def finalize(self, upload_id):
+        return self.client.post(f"/products/upload/chunked/{upload_id}/finalize/")
+
+    def staged(self, job_id):
+        with connection.cursor() as cur:
+            cur.execute(f"SELECT sku FROM {staging_table(job_id)} ORDER BY id")
+            return [sku for sku, in cur.fetchall()]
+
+    def test_upload_in_chunks_and_finalize(self, phase1, phase2):
+        upload_id = self.init()["upload_id"]
+        self.assertEqual(self.put(upload_id, 0, DATA[:10]).json()["offset"], 10)
+        # a retried chunk at a stale offset is told where to resume
+        response = self.put(upload_id, 0, DATA[:10])
+        self.assertEqual((response.status_code, response.json()["offset"]), (409, 10))
+        self.assertEqual(self.put(upload_id, 10, DATA[10:]).json()["offset"], len(DATA))
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 202)
+        job = UploadJob.objects.get(id=response.json()["job_id"])
+        with open(job.file_path, "rb") as fh:
+            self.assertEqual(fh.read(), DATA)
+        phase1.assert_called_once()
+        phase2.assert_not_called()
+
+    def test_chunk_past_the_declared_size_is_refused(self, phase1, phase2):
+        upload_id = self.init()["upload_id"]
+        self.assertEqual(self.put(upload_id, 0, DATA + b"x").status_code, 400)
+        self.assertEqual(self.client.get(f"/products/upload/chunked/{upload_id}/").json()["offset"], 0)
+
+    def test_incomplete_upload_cannot_finalize(self, phase1, phase2):
+        upload_id = self.init()["upload_id"]
+        self.put(upload_id, 0, DATA[:10])
+        response = self.finalize(upload_id)
+        self.assertEqual((response.status_code, response.json()["offset"]), (409, 10))
+        phase1.assert_not_called()
+
+    def test_busy_upload_answers_409(self, phase1, phase2):
+        upload_id = self.init()["upload_id"]
+        lock = views._upload_lock(upload_id)
+        self.assertTrue(lock.acquire())
+        self.addCleanup(lock.release)
+        with mock.patch.object(views, "CHUNKED_UPLOAD_LOCK_WAIT", 0.1):
+            self.assertEqual(self.put(upload_id, 0, DATA).status_code, 409)
+
+    def test_streamed_upload_stages_complete_records_only(self, phase1, phase2):
+        init = self.init(stream=True)
+        upload_id, job_id = init["upload_id"], init["job_id"]
+        # the chunk ends inside the quoted field of the first record
+        split = DATA.index(b"second")
+        self.put(upload_id, 0, DATA[:split])
+        self.assertEqual(self.staged(job_id), [])
+        self.put(upload_id, split, DATA[split:-4])
+        self.assertEqual(self.staged(job_id), ["a", "b"])
+        self.put(upload_id, len(DATA) - 4, DATA[-4:])
+
+        self.assertEqual(self.finalize(upload_id).status_code, 202)
+        self.assertEqual(self.staged(job_id), ["a", "b", "c"])
+        job = UploadJob.objects.get(id=job_id)
+        self.assertEqual((job.status, job.total_rows), ("queued", 3))
+        phase2.assert_called_once()
+        phase1.assert_not_called()
+
+    def test_streamed_checksum_mismatch_fails_the_job(self, phase1, phase2):
+        init = self.init(stream=True, sha256=hashlib.sha256(b"something else").hexdigest())
+        self.put(init["upload_id"], 0, DATA)
+
+        self.assertEqual(self.finalize(init["upload_id"]).status_code, 422)
+        job = UploadJob.objects.get(id=init["job_id"])
+        self.assertEqual((job.status, job.error_message), ("failed", "Checksum mismatch"))
+        with connection.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s)", [staging_table(job.id)])
+            self.assertIsNone(cur.fetchone()[0])
+        phase1.assert_not_called()
+        phase2.assert_not_called()
@@ -0,0 +1,97 @@
+# catalog/tests/test_validation.py
+import csv
+import io
+import os
+from django.test import SimpleTestCase, TestCase
+from ..copy_utils import OffsetLines
+from ..models import Product
+from ..validation import SKU_MAX_LENGTH, InvalidImportError, RowValidator, numbered, validate_header
+from .helpers import HEADER, ImportMixin, TempDirMixin
+
+
+class ValidationTests(TempDirMixin, SimpleTestCase):
+    def read_rejects(self, path):
+        with open(path, newline="", encoding="utf-8", errors="surrogateescape") as fh:
+            return list(csv.reader(fh))
+
+    def test_header(self):
+        self.assertEqual(validate_header([" SKU", "Name ", "description"]), HEADER)
+        for header in (["sku", "name"], ["sku", "name", "description", "price"],
+                       ["sku", "name", "description", "sku"]):
+            with self.subTest(header=header), self.assertRaises(InvalidImportError):
+                validate_header(header)
+
+    def test_filter_passes_good_rows_and_writes_rejects(self):
+        rejects = os.path.join(self.tmp, "rejects.csv")
+        validator = RowValidator(HEADER, rejects, line_prefix="0:")
+        rows = [
+            (2, ["a", "A", ""]),
+            (3, ["", "no sku", ""]),
+            (4, ["b", "B"]),
+            (5, []),
+            (6, ["c", "C", "nul\x00"]),
+            (7, ["d", "D", "ok"]),
+        ]
+        self.assertEqual(list(validator.filter(rows)), [["a", "A", ""], ["d", "D", "ok"]])
+        validator.close()
+
+        self.assertEqual(validator.rejected, 3)
+        written = self.read_rejects(rejects)
+        self.assertEqual(written[0], ["line", "reason"] + HEADER)
+        self.assertEqual([r[:2] for r in written[1:]], [
+            ["0:3", "empty sku"],
+            ["0:4", "expected 3 columns, got 2"],
+            ["0:6", "NUL byte in value"],
+        ])
+
+    def test_rejects_file_is_shared(self):
+        rejects = os.path.join(self.tmp, "rejects.csv")
+        for prefix in ("1:", "2:"):
+            validator = RowValidator(HEADER, rejects, line_prefix=prefix)
+            list(validator.filter([(2, ["", "", ""])]))
+            validator.close()
+        # one header row, whoever wrote first
+        self.assertEqual([r[0] for r in self.read_rejects(rejects)], ["line", "1:2", "2:2"])
+
+    def test_sku_length_counts_the_staged_value(self):
+        validator = RowValidator(HEADER, os.path.join(self.tmp, "rejects.csv"))
+        self.assertIsNone(validator.reason(["x" * SKU_MAX_LENGTH, "A", ""]))
+        self.assertEqual(
+            validator.reason([" " + "x" * SKU_MAX_LENGTH, "A", ""]),
+            f"sku longer than {SKU_MAX_LENGTH} characters",
+        )
+
+    def test_invalid_utf8_and_oversized_fields_are_rejected_per_line(self):
+        data = (
+            b"a,A,ok\n"
+            b"b,B,caf\xe9\n"
+            b"c,C," + b"x" * (csv.field_size_limit() + 1) + b"\n"
+            b"d,D,ok\n"
+        )
+        rejects = os.path.join(self.tmp, "rejects.csv")
+        validator = RowValidator(HEADER, rejects)
+        reader = csv.reader(OffsetLines(io.BytesIO(data), 0))
+        parsed = numbered(reader, 1, on_error=validator.reject_unparsable)
+        self.assertEqual([r[0] for r in validator.filter(parsed)], ["a", "d"])
+        validator.close()
+
+        written = self.read_rejects(rejects)
+        self.assertEqual([r[0] for r in written[1:]], ["4", "3"])
+        self.assertTrue(written[1][1].startswith("unparsable: field larger than field limit"))
+        self.assertEqual(written[2][1:], ["invalid UTF-8", "b", "B", "caf\udce9"])
+        # the rejects file keeps the original bytes
+        with open(rejects, "rb") as fh:
+            self.assertIn(b"caf\xe9", fh.read())
+
+
+class RejectedImportTests(ImportMixin, TestCase):
+    def test_malformed_rows_do_not_fail_the_job(self):
+        path = os.path.join(self.tmp, "malformed.csv")
+        with open(path, "wb") as fh:
+            fh.write(b"sku,name,description\na,A,ok\nb,B,caf\xe9\nc,C,"
+                     + b"x" * (csv.field_size_limit() + 1) + b"\nd,D,ok\n")
+
+        job = self.import_file(path)
+        self.assertEqual(job.status, "completed", job.error_message)
+        self.assertEqual(job.rejected_rows, 2)
+        self.assertEqual(sorted(Product.objects.values_list("sku", flat=True)), ["a", "d"])
@@ -1,10 +1,19 @@
 from django.urls import path
-from .views import upload_products, update_product_status
-from .sse_views import progress_stream, stream_devices  
+from .views import (
+    upload_products, update_product_status, bulk_update_product_status_view,
+    init_chunked_upload, chunked_upload, finalize_chunked_upload,
+)
+from .sse_views import progress_stream, stream_devices, stream_devices_ndjson, export_devices
 
 urlpatterns = [
     path("upload/", upload_products),
+    path("upload/chunked/", init_chunked_upload, name='init_chunked_upload'),
+    path("upload/chunked/<str:upload_id>/", chunked_upload, name='chunked_upload'),
+    path("upload/chunked/<str:upload_id>/finalize/", finalize_chunked_upload, name='finalize_chunked_upload'),
     path('progress/<str:job_id>/', progress_stream, name='progress_stream'),
     path('devices/stream/', stream_devices, name='stream_devices'),
+    path('devices/stream/ndjson/', stream_devices_ndjson, name='stream_devices_ndjson'),
+    path('devices/export/', export_devices, name='export_devices'),
     path('device/<int:product_id>/update-status/', update_product_status, name='update_product_status'),
+    path('devices/bulk-update-status/', bulk_update_product_status_view, name='bulk_update_product_status'),
 ]
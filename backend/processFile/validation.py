@@ -0,0 +1,151 @@
+# catalog/validation.py
+import csv
+import io
+import os
+from itertools import islice
+from django.conf import settings
+from .models import Product
+
+# columns a CSV may provide; they are interpolated into the COPY statement
+ALLOWED_COLUMNS = ("sku", "name", "description")
+# every product column is NOT NULL, so a file without one could never merge
+REQUIRED_COLUMNS = ALLOWED_COLUMNS
+VALIDATE_BATCH = 2000
+
+SKU_MAX_LENGTH = Product._meta.get_field("sku").max_length
+NAME_MAX_LENGTH = Product._meta.get_field("name").max_length
+
+
+class InvalidImportError(Exception):
+    """The file itself can never import; retrying the task will not help."""
+
+
+def validate_header(header):
+    columns = [c.strip().lower() for c in header]
+    unknown = [c for c in columns if c not in ALLOWED_COLUMNS]
+    if unknown:
+        raise InvalidImportError(f"Unknown column(s): {', '.join(unknown)}")
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise InvalidImportError(f"Missing required column(s): {', '.join(missing)}")
+    if len(set(columns)) != len(columns):
+        raise InvalidImportError("Duplicate column names in header")
+    return columns
+
+
+def rejects_path_for(job_id):
+    rejects_dir = os.path.join(settings.MEDIA_ROOT, "rejects")
+    os.makedirs(rejects_dir, exist_ok=True)
+    return os.path.join(rejects_dir, f"{job_id}.csv")
+
+
+class RowValidator:
+    """
+    Checks rows in batches as they stream from the CSV reader to COPY.
+
+    Good rows are passed through; bad ones are appended to a per-job rejects
+    CSV (line, reason, original fields) that is only created once the first
+    bad row shows up. Each batch is one O_APPEND write, so shards of the same
+    job can share the file; their line numbers are "<byte offset>:<line>".
+    """
+
+    def __init__(self, header, rejects_path, line_prefix=""):
+        self.header = header
+        self.width = len(header)
+        self.sku_idx = header.index("sku")
+        self.name_idx = header.index("name")
+        self.rejects_path = rejects_path
+        self.line_prefix = line_prefix
+        self.rejected = 0
+        self._fd = None
+        self._needs_header = False
+
+    def reason(self, row):
+        """Why `row` would be rejected, or None when it is valid."""
+        if len(row) != self.width:
+            return f"expected {self.width} columns, got {len(row)}"
+        # the value is staged as is, so its length is checked unstripped
+        sku = row[self.sku_idx]
+        if not sku.strip():
+            return "empty sku"
+        if len(sku) > SKU_MAX_LENGTH:
+            return f"sku longer than {SKU_MAX_LENGTH} characters"
+        if len(row[self.name_idx]) > NAME_MAX_LENGTH:
+            return f"name longer than {NAME_MAX_LENGTH} characters"
+        text = "".join(row)
+        if "\x00" in text:
+            return "NUL byte in value"
+        if not text.isascii():
+            try:
+                text.encode("utf-8")
+            except UnicodeEncodeError:  # lone surrogates from undecodable bytes
+                return "invalid UTF-8"
+        return None
+
+    def reject_unparsable(self, line, exc):
+        """Record a line csv.reader could not parse (see numbered())."""
+        self._write_rejects([[f"{self.line_prefix}{line}", f"unparsable: {exc}"]])
+
+    def _write_rejects(self, rejects):
+        if self._fd is None:
+            flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+            try:
+                # whoever creates the file writes the header row
+                self._fd = os.open(self.rejects_path, flags | os.O_EXCL, 0o644)
+                self._needs_header = True
+            except FileExistsError:
+                self._fd = os.open(self.rejects_path, flags, 0o644)
+
+        out = io.StringIO()
+        writer = csv.writer(out)
+        if self._needs_header:
+            writer.writerow(["line", "reason"] + self.header)
+            self._needs_header = False
+        writer.writerows(rejects)
+        # undecodable input bytes are written back exactly as they came in
+        os.write(self._fd, out.getvalue().encode("utf-8", "surrogateescape"))
+        self.rejected += len(rejects)
+
+    def filter(self, numbered_rows):
+        """Yield the valid rows of an iterator of (line_number, row) pairs."""
+        numbered_rows = iter(numbered_rows)
+        while True:
+            batch = list(islice(numbered_rows, VALIDATE_BATCH))
+            if not batch:
+                break
+            rejects = []
+            for line, row in batch:
+                if not row:
+                    continue  # blank line
+                reason = self.reason(row)
+                if reason is None:
+                    yield row
+                else:
+                    rejects.append([f"{self.line_prefix}{line}", reason] + row)
+            if rejects:
+                self._write_rejects(rejects)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def numbered(reader, start=0, on_error=None):
+    """
+    Pair each row of a csv.reader with the line it ended on (plus `start`).
+
+    Rows the reader cannot parse (e.g. a field over csv.field_size_limit())
+    are skipped after being passed to `on_error(line, exc)`; the reader
+    carries on with the next line.
+    """
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            if on_error is not None:
+                on_error(start + reader.line_num, exc)
+            continue
+        yield start + reader.line_num, row
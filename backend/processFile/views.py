@@ -1,14 +1,94 @@
 # catalog/views.py
+import csv
+import hashlib
+import logging
 import os
+import uuid
+from functools import wraps
 from django.conf import settings
-from django.http import JsonResponse
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
+from redis.exceptions import LockError
 from .models import UploadJob
-from .tasks import process_csv_phase1
-from django.views.decorators.http import require_POST
+from .tasks import bulk_set_active, bulk_update_product_status, process_csv_phase1, process_csv_phase2
+from .listing import bump_catalog_version
+from .copy_utils import (
+    MAGIC_BYTES, copy_to_staging, detect_compression, iter_range_lines, last_record_end,
+    read_header_line,
+)
+from .lanes import choose_lane, default_lane, import_queue, lane_config, lane_for_file, merge_queue
+from .metrics import inc, render as render_metrics, start_phase
+from .redis_utils import set_progress
+from .staging import create_staging, drop_staging
+from .validation import RowValidator, numbered, rejects_path_for, validate_header
+from django.views.decorators.http import require_GET, require_POST
 from .models import Product
 import json
 
+logger = logging.getLogger(__name__)
+
+
+def _enqueue_import(filename, file_path, options=None):
+    # small files go to the fast lane so they never queue behind bulk imports
+    options = {**(options or {}), "lane": lane_for_file(file_path)}
+    job = UploadJob.objects.create(
+        filename=filename, status="pending", options=options, file_path=file_path,
+    )
+
+    # enqueue Phase 1 job to the lane's import queue
+    process_csv_phase1.apply_async(args=[str(job.id), file_path], queue=import_queue(job))
+    inc("import_jobs_total", lane=options["lane"])
+    return job
+
+
+def _flag(value):
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+
+IMPORT_MODES = ("upsert", "mirror")
+
+
+def _import_options(data):
+    """
+    Import switches from form fields or a JSON body:
+
+    - dedup=1: drop repeated skus (last row wins) before staging; rows
+      differing only in case are still resolved by the merge
+    - mode=mirror: the file is the full catalog; active products missing
+      from it are deactivated, unless that exceeds max_deactivate_pct
+    """
+    options = {}
+    if _flag(data.get("dedup", False)):
+        options["dedup"] = True
+
+    mode = data.get("mode") or "upsert"
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"'mode' must be one of: {', '.join(IMPORT_MODES)}")
+    if mode == "mirror":
+        options["mode"] = mode
+        pct = data.get("max_deactivate_pct")
+        if pct not in (None, ""):
+            try:
+                pct = float(pct)
+            except (TypeError, ValueError):
+                pct = -1
+            if not 0 <= pct <= 100:
+                raise ValueError("'max_deactivate_pct' must be a number between 0 and 100")
+            options["max_deactivate_pct"] = pct
+    return options
+
+
+def _media_path(filename):
+    # ensure MEDIA_ROOT exists
+    tmp_dir = settings.MEDIA_ROOT
+    os.makedirs(tmp_dir, exist_ok=True)
+    file_name = f"{os.path.basename(filename)}-{os.urandom(6).hex()}"
+    return os.path.join(tmp_dir, file_name)
+
+
 @csrf_exempt
 def upload_products(request):
     if request.method != "POST":
@@ -18,24 +98,302 @@ def upload_products(request):
     if not upload_file:
         return JsonResponse({"error": "file missing"}, status=400)
 
-    # ensure MEDIA_ROOT exists
-    tmp_dir = settings.MEDIA_ROOT
-    os.makedirs(tmp_dir, exist_ok=True)
-    file_name = f"{upload_file.name}-{os.urandom(6).hex()}"
-    file_path = os.path.join(tmp_dir, file_name)
+    try:
+        options = _import_options(request.POST)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    file_path = _media_path(upload_file.name)
 
     # save file
     with open(file_path, 'wb') as fh:
         for chunk in upload_file.chunks():
             fh.write(chunk)
 
-    job = UploadJob.objects.create(filename=upload_file.name, status="pending")
+    job = _enqueue_import(upload_file.name, file_path, options)
+
+    return JsonResponse({"job_id": str(job.id)}, status=202)
+
+
+# ---------------------------------------------------------
+# RESUMABLE CHUNKED UPLOADS
+# init -> PUT chunks at offsets -> finalize
+# ---------------------------------------------------------
+CHUNKED_UPLOAD_TTL = 60*60*24
+COPY_BLOCK = 1024 * 1024
+# a PUT or finalize holds its upload's lock for at most this long
+CHUNKED_UPLOAD_LOCK_SECONDS = 5 * 60
+# how long a request waits for a concurrent one on the same upload
+CHUNKED_UPLOAD_LOCK_WAIT = 5
+
+
+def _chunked_key(upload_id):
+    return f"chunked_upload:{upload_id}"
+
+
+def _upload_offset(upload):
+    try:
+        return os.path.getsize(upload["file_path"])
+    except FileNotFoundError:
+        return 0
+
+
+def _upload_lock(upload_id):
+    """
+    Per-upload lock, so a retried PUT cannot write or stage the same
+    offset twice while the first attempt is still running.
+    """
+    return cache.lock(
+        f"{_chunked_key(upload_id)}:lock",
+        timeout=CHUNKED_UPLOAD_LOCK_SECONDS,
+        blocking_timeout=CHUNKED_UPLOAD_LOCK_WAIT,
+    )
+
+
+def _locked(view):
+    """Run a chunked upload view under its upload's lock; 409 when busy."""
+    @wraps(view)
+    def wrapper(request, upload_id):
+        lock = _upload_lock(upload_id)
+        if not lock.acquire():
+            return JsonResponse({"error": "Upload busy; retry"}, status=409)
+        try:
+            return view(request, upload_id)
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                # held past its timeout; someone else may own it by now
+                logger.warning("Lock for upload %s expired before release", upload_id)
+    return wrapper
+
+
+@csrf_exempt
+@require_POST
+def init_chunked_upload(request):
+    try:
+        body = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    filename = body.get("filename")
+    size = body.get("size")
+    if not filename or not isinstance(size, int) or size < 0:
+        return JsonResponse({"error": "'filename' and integer 'size' required"}, status=400)
+    try:
+        options = _import_options(body)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    upload_id = uuid.uuid4().hex
+    upload = {
+        "filename": filename,
+        "size": size,
+        "sha256": (body.get("sha256") or "").lower() or None,
+        "file_path": _media_path(filename),
+        "options": options,
+        # dedup reads the whole file twice, so it cannot stage while uploading
+        "stream": bool(body.get("stream")) and not options.get("dedup"),
+    }
+    # create the final file up front; chunks are written straight into it
+    open(upload["file_path"], "wb").close()
+
+    job_id = None
+    if upload["stream"]:
+        # parse-while-uploading: the job exists from the start and every
+        # chunk is staged as soon as it lands
+        options = {**options, "lane": choose_lane(size)}
+        job = UploadJob.objects.create(
+            filename=filename, status="uploading", options=options,
+            file_path=upload["file_path"], heartbeat_at=timezone.now(),
+        )
+        job_id = str(job.id)
+        create_staging(job_id)
+        upload.update({"job_id": job_id, "header": None, "parsed": 0, "rows": 0})
+        start_phase(job, "staging")
+        set_progress(job_id, processed=0, total=0, status="uploading")
 
-    # enqueue Phase 1 job to 'imports' queue
-    process_csv_phase1.apply_async(args=[str(job.id), file_path], queue='imports')
+    cache.set(_chunked_key(upload_id), upload, CHUNKED_UPLOAD_TTL)
+
+    return JsonResponse({
+        "upload_id": upload_id,
+        "job_id": job_id,
+        "offset": 0,
+        "chunk_size": getattr(settings, "CHUNKED_UPLOAD_CHUNK_SIZE", 2 * 1024 * 1024),
+    }, status=201)
+
+
+@csrf_exempt
+def chunked_upload(request, upload_id):
+    """GET returns the resume offset, PUT appends a chunk at ?offset=."""
+    if request.method == "PUT":
+        return _put_chunk(request, upload_id)
+    if request.method != "GET":
+        return JsonResponse({"error": "GET or PUT required"}, status=405)
+
+    upload = cache.get(_chunked_key(upload_id))
+    if upload is None:
+        return JsonResponse({"error": "Upload not found"}, status=404)
+    return JsonResponse({"offset": _upload_offset(upload), "size": upload["size"]})
+
+
+@_locked
+def _put_chunk(request, upload_id):
+    upload = cache.get(_chunked_key(upload_id))
+    if upload is None:
+        return JsonResponse({"error": "Upload not found"}, status=404)
+
+    current = _upload_offset(upload)
+
+    try:
+        offset = int(request.GET.get("offset", request.headers.get("Upload-Offset", "")))
+    except ValueError:
+        return JsonResponse({"error": "offset required"}, status=400)
+    if offset != current:
+        # client is out of sync; tell it where to resume from
+        return JsonResponse({"error": "Offset mismatch", "offset": current}, status=409)
+
+    written = 0
+    with open(upload["file_path"], "r+b") as fh:
+        fh.seek(offset)
+        while True:
+            block = request.read(COPY_BLOCK)
+            if not block:
+                break
+            if offset + written + len(block) > upload["size"]:
+                fh.truncate(offset + written)
+                return JsonResponse({"error": "Chunk exceeds declared size"}, status=400)
+            fh.write(block)
+            written += len(block)
+
+    if upload["stream"]:
+        _stage_received(upload)
+    cache.set(_chunked_key(upload_id), upload, CHUNKED_UPLOAD_TTL)
+    return JsonResponse({"offset": offset + written, "size": upload["size"]})
+
+
+@csrf_exempt
+@require_POST
+@_locked
+def finalize_chunked_upload(request, upload_id):
+    upload = cache.get(_chunked_key(upload_id))
+    if upload is None:
+        return JsonResponse({"error": "Upload not found"}, status=404)
+
+    current = _upload_offset(upload)
+    if current != upload["size"]:
+        return JsonResponse({"error": "Upload incomplete", "offset": current}, status=409)
+
+    if upload["sha256"]:
+        digest = hashlib.sha256()
+        with open(upload["file_path"], "rb") as fh:
+            for block in iter(lambda: fh.read(COPY_BLOCK), b""):
+                digest.update(block)
+        if digest.hexdigest() != upload["sha256"]:
+            if upload["stream"]:
+                # the corrupted rows are already staged; nothing can resume this job
+                cache.delete(_chunked_key(upload_id))
+                drop_staging(upload["job_id"])
+                UploadJob.objects.filter(id=upload["job_id"]).update(
+                    status="failed", error_message="Checksum mismatch",
+                    heartbeat_at=timezone.now(),
+                )
+                set_progress(upload["job_id"], status="failed", error="Checksum mismatch")
+            return JsonResponse({"error": "Checksum mismatch"}, status=422)
+
+    cache.delete(_chunked_key(upload_id))
+
+    if not upload["stream"]:
+        job = _enqueue_import(upload["filename"], upload["file_path"], upload["options"])
+        return JsonResponse({"job_id": str(job.id)}, status=202)
+
+    job = UploadJob.objects.get(id=upload["job_id"])
+    if _stage_received(upload, final=True):
+        # everything is already staged: go straight to the merge
+        job.status = "queued"
+        job.heartbeat_at = timezone.now()
+        job.total_rows = upload["rows"]
+        job.processed_rows = upload["rows"]
+        job.rejected_rows = upload.get("rejected", 0)
+        job.rejects_path = rejects_path_for(job.id) if job.rejected_rows else None
+        job.save(update_fields=[
+            "status", "heartbeat_at", "total_rows", "processed_rows", "rejected_rows", "rejects_path",
+        ])
+        set_progress(job.id, processed=upload["rows"], total=upload["rows"], status="staging")
+        process_csv_phase2.apply_async(args=[str(job.id)], queue=merge_queue(job))
+    else:
+        # incremental staging was abandoned; import the saved file from scratch
+        job.status = "queued"
+        job.heartbeat_at = timezone.now()
+        job.save(update_fields=["status", "heartbeat_at"])
+        process_csv_phase1.apply_async(args=[str(job.id), upload["file_path"]], queue=import_queue(job))
+    inc("import_jobs_total", lane=job.options.get("lane", default_lane()))
 
     return JsonResponse({"job_id": str(job.id)}, status=202)
 
+
+def _stage_received(upload, final=False):
+    """
+    COPY the complete records received since the last chunk into the job's
+    staging table. A record whose quoted field is still open at the end of
+    the chunk waits for the next one. With `final`, the trailing record is
+    staged too.
+
+    Returns False once incremental staging has been abandoned, in which case
+    the partial rows are dropped and finalize falls back to phase 1 on the
+    persisted file.
+    """
+    if not upload["stream"] or upload.get("failed"):
+        return False
+
+    job_id = upload["job_id"]
+    end = _upload_offset(upload)
+    try:
+        with open(upload["file_path"], "rb") as fh:
+            if upload["header"] is None:
+                if last_record_end(fh, 0, end) == 0 and not final:
+                    return True  # header record not complete yet
+                fh.seek(0)
+                if detect_compression(fh.read(MAGIC_BYTES)):
+                    # compressed input is only decoded as a whole by phase 1
+                    logger.info("Job %s upload is compressed; staging after finalize", job_id)
+                    upload["failed"] = True
+                    drop_staging(job_id)
+                    return False
+                fh.seek(0)
+                header, upload["parsed"] = read_header_line(fh)
+                upload["header"] = validate_header(header)
+
+            if not final:
+                end = last_record_end(fh, upload["parsed"], end)
+            if end <= upload["parsed"]:
+                return True
+
+            reader = csv.reader(iter_range_lines(fh, upload["parsed"], end))
+            validator = RowValidator(
+                upload["header"], rejects_path_for(job_id), line_prefix=f"{upload['parsed']}:"
+            )
+            parsed = numbered(reader, on_error=validator.reject_unparsable)
+            try:
+                with connection.cursor() as cur:
+                    rows = copy_to_staging(
+                        cur, job_id, upload["header"], validator.filter(parsed)
+                    )
+            finally:
+                validator.close()
+    except Exception as e:
+        logger.exception("Incremental staging failed for job %s: %s", job_id, e)
+        upload["failed"] = True
+        drop_staging(job_id)
+        return False
+
+    upload["parsed"] = end
+    upload["rows"] += rows
+    upload["rejected"] = upload.get("rejected", 0) + validator.rejected
+    UploadJob.objects.filter(id=job_id).update(heartbeat_at=timezone.now())
+    set_progress(job_id, processed=upload["rows"], total=upload["rows"], status="uploading")
+    return True
+
 @csrf_exempt
 @require_POST
 def update_product_status(request, product_id):
@@ -48,6 +406,7 @@ def update_product_status(request, product_id):
         product = Product.objects.get(id=product_id)
         product.active = active
         product.save()
+        bump_catalog_version()
 
         return JsonResponse({
             "id": product.id,
@@ -57,7 +416,85 @@ def update_product_status(request, product_id):
         return JsonResponse({"error": "Product not found"}, status=404)
     except json.JSONDecodeError:
         return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+
+BULK_FILTER_KEYS = ("sku", "active", "match")
+
+
+def _bulk_filter(filters):
+    """
+    Check a bulk `filter` object before it can select products: only the
+    stream_devices parameters, all strings, and at least one that narrows
+    the selection, so a typo cannot flip the whole catalog.
+    """
+    if not isinstance(filters, dict):
+        raise ValueError("'filter' must be an object")
+    unknown = sorted(set(filters) - set(BULK_FILTER_KEYS))
+    if unknown:
+        raise ValueError(f"Unknown filter key(s): {', '.join(unknown)}")
+    if not all(isinstance(value, str) for value in filters.values()):
+        raise ValueError("Filter values must be strings")
+    if filters.get("active", "").lower() not in ("", "true", "false"):
+        raise ValueError("'active' filter must be 'true' or 'false'")
+    if filters.get("match", "contains") not in ("contains", "prefix"):
+        raise ValueError("'match' filter must be 'contains' or 'prefix'")
+    if not filters.get("sku") and not filters.get("active"):
+        raise ValueError("'filter' needs a non-empty 'sku' or 'active'")
+    return filters
+
+
+@csrf_exempt
+@require_POST
+def bulk_update_product_status_view(request):
+    """
+    Set `active` on many products at once, selected by `ids`, `skus` or a
+    `filter` object taking the stream_devices query parameters.
+
+    Small id/sku lists are applied inline; anything larger, and every
+    filter-based request, runs in the background with SSE progress.
+    """
+    try:
+        body = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    active = body.get("active", None)
+    if not isinstance(active, bool):
+        return JsonResponse({"error": "Missing 'active' field"}, status=400)
+
+    ids, skus, filters = body.get("ids"), body.get("skus"), body.get("filter")
+    if sum(x is not None for x in (ids, skus, filters)) != 1:
+        return JsonResponse({"error": "Provide exactly one of 'ids', 'skus' or 'filter'"}, status=400)
+    if filters is not None:
+        try:
+            filters = _bulk_filter(filters)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+    if ids is not None and not (isinstance(ids, list) and all(isinstance(i, int) for i in ids)):
+        return JsonResponse({"error": "'ids' must be a list of integers"}, status=400)
+    if skus is not None and not isinstance(skus, list):
+        return JsonResponse({"error": "'skus' must be a list"}, status=400)
+
+    targets = ids if ids is not None else skus
+    sync_limit = getattr(settings, "BULK_STATUS_SYNC_LIMIT", 1000)
+    if filters is None and len(targets) <= sync_limit:
+        updated = bulk_set_active(active, ids=ids, skus=skus)
+        return JsonResponse({"updated": updated})
+
+    job_id = str(uuid.uuid4())
+    set_progress(job_id, processed=0, total=0, status="pending")
+    bulk_update_product_status.apply_async(
+        args=[job_id, active],
+        kwargs={"ids": ids, "skus": skus, "filters": filters},
+        queue=lane_config(default_lane() if filters is not None else choose_lane(rows=len(targets)))["queue"],
+    )
+    return JsonResponse({"job_id": job_id}, status=202)
     
+@require_GET
+def metrics(request):
+    """Prometheus text exposition of import, progress, SSE and listing metrics."""
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 # @csrf_exempt
 # @require_DELETE
 # def delete_product(request, product_id):